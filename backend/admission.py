@@ -0,0 +1,177 @@
+import asyncio
+import os
+from collections import deque
+from typing import Optional
+from starlette.responses import JSONResponse
+from .database import READ_POOL_SIZE
+
+# Admission control
+#
+# Requests are sorted into groups, and each group admits a limited number at
+# a time. Those over the limit wait in a bounded queue for up to the group's
+# timeout. A request that finds the queue full, or is still waiting at the
+# deadline, is answered at once with 503 and Retry-After. A flood of report
+# or export requests therefore fills the "reports" queue and is shed there,
+# while CRUD, login and writes keep their own slots.
+#
+#   auth     POST /token, /users/register      (bcrypt; see auth.py)
+#   reports  /reports, /export, /views/reports  (large reads and aggregations)
+#   writes   POST, PUT, PATCH and DELETE elsewhere
+#   reads    every other GET, including the inventory and crop-planning views
+#
+# Every limit can be set from the environment, e.g. ADMISSION_REPORTS_LIMIT,
+# ADMISSION_REPORTS_QUEUE and ADMISSION_REPORTS_TIMEOUT_MS. Set
+# ADMISSION_CONTROL=0 to turn it off. Gauges are served at GET /admission.
+
+AUTH = "auth"
+REPORTS = "reports"
+WRITES = "writes"
+READS = "reads"
+
+# group: (concurrent requests, queued requests, queue timeout in ms). Reports
+# hold a read connection for their whole run, so they get half the read pool.
+DEFAULT_LIMITS = {
+    AUTH: (8, 32, 5000),
+    REPORTS: (READ_POOL_SIZE, READ_POOL_SIZE * 4, 2000),
+    WRITES: (32, 128, 5000),
+    READS: (64, 256, 5000),
+}
+
+AUTH_PATHS = ("/token", "/users/register")
+REPORT_PREFIXES = ("/reports", "/export", "/views/reports")
+EXEMPT_PATHS = ("/", "/admission", "/docs", "/redoc", "/openapi.json")
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+ENABLED = os.getenv("ADMISSION_CONTROL", "1").lower() not in ("0", "false", "no")
+
+def classify(method: str, path: str) -> Optional[str]:
+    """The group a request belongs to, or None for requests that are never held back."""
+    if method == "OPTIONS" or path in EXEMPT_PATHS:
+        return None
+    if path in AUTH_PATHS:
+        return AUTH
+    if path.startswith(REPORT_PREFIXES):
+        return REPORTS
+    if method in WRITE_METHODS:
+        return WRITES
+    return READS
+
+class Saturated(Exception):
+    """The group's queue is full or the request waited past its deadline."""
+
+class Gate:
+    """A concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, timeout_ms: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout = timeout_ms / 1000
+        self.active = 0
+        self._waiters = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self):
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise Saturated()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the deadline passed; give it on
+                self.release()
+            else:
+                waiter.cancel()
+            self.timed_out += 1
+            raise Saturated()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter still waiting
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_queue": self.max_queue,
+            "timeout_ms": int(self.timeout * 1000),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+def _limit(group: str, setting: str, default) -> float:
+    return float(os.getenv(f"ADMISSION_{group.upper()}_{setting}", default))
+
+def gates_from_env() -> dict:
+    return {
+        group: Gate(
+            group,
+            int(_limit(group, "LIMIT", limit)),
+            int(_limit(group, "QUEUE", queue)),
+            _limit(group, "TIMEOUT_MS", timeout_ms),
+        )
+        for group, (limit, queue, timeout_ms) in DEFAULT_LIMITS.items()
+    }
+
+gates = gates_from_env()
+
+def stats() -> dict:
+    return {"enabled": ENABLED, "groups": {name: gate.stats() for name, gate in gates.items()}}
+
+class AdmissionMiddleware:
+    def __init__(self, app, gates: dict = gates, retry_after: int = 1):
+        self.app = app
+        self.gates = gates
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        group = classify(scope["method"], scope["path"])
+        if group is None:
+            await self.app(scope, receive, send)
+            return
+
+        gate = self.gates[group]
+        try:
+            await gate.acquire()
+        except Saturated:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": f"Too many {group} requests in progress, try again shortly"},
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            # Held until the response is fully sent, so streaming exports count too
+            await self.app(scope, receive, send)
+        finally:
+            gate.release()
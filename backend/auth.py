@@ -1,11 +1,19 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import models, schemas, database
+from .cache import TTLCache, table_generations
 
 # Secret key to sign JWTs (should be in env vars in production)
 SECRET_KEY = "supersecretkey" 
@@ -14,11 +22,85 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Authentication caches
+#
+# A token whose signature has been checked is remembered until it expires,
+# and the principal behind a username (id, role, is_active) is kept for
+# AUTH_CACHE_TTL_SECONDS, so an authenticated request normally costs two
+# dictionary lookups instead of a JWT decode and a users query. The users
+# router drops a principal as soon as it updates or deletes that user. Other
+# workers keep serving their copy for at most the TTL.
+
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+
+verified_tokens = TTLCache(max_entries=AUTH_CACHE_SIZE)  # token -> username
+principals = TTLCache(max_entries=AUTH_CACHE_SIZE)  # username -> Principal
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user as the routes see it, detached from any session."""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+
+def forget_user(*usernames: str):
+    """Drop cached principals after the users behind them were changed or deleted."""
+    for username in usernames:
+        principals.pop(username)
+
+# Password hashing
+#
+# bcrypt is deliberately slow (about 250 ms at 12 rounds). Hashing and checking
+# run on a small dedicated thread pool (bcrypt releases the GIL), so a burst
+# of logins neither stalls the event loop nor takes every worker thread. At
+# most PASSWORD_QUEUE_LIMIT operations may be running or waiting; beyond that
+# the request is rejected at once with 503 and Retry-After rather than queued
+# for seconds. When BCRYPT_ROUNDS changes, a user's hash is upgraded at their
+# next successful login.
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", str(PASSWORD_WORKERS * 8)))
+
+class PasswordHasherBusy(Exception):
+    """Too many password operations are already running or queued."""
+
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt")
+_password_lock = threading.Lock()
+_password_pending = 0
+
 def verify_password(plain_password, hashed_password):
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether the hash was made with a cost other than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+async def _run_password_operation(function, *args):
+    global _password_pending
+    with _password_lock:
+        if _password_pending >= PASSWORD_QUEUE_LIMIT:
+            raise PasswordHasherBusy()
+        _password_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_executor, function, *args)
+    finally:
+        with _password_lock:
+            _password_pending -= 1
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_operation(verify_password, plain_password, hashed_password)
+
+async def hash_password(password: str) -> str:
+    return await _run_password_operation(get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -30,31 +112,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_read_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    username = verified_tokens.get(token)
+    if username is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            username: str = payload.get("sub")
+            if username is None:
+                raise credentials_exception
+            token_data = schemas.TokenData(username=username)
+        except JWTError:
             raise credentials_exception
-        token_data = schemas.TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+        username = token_data.username
+        verified_tokens.put(token, username, payload.get("exp", 0) - time.time())
+
+    principal = principals.get(username)
+    if principal is not None:
+        return principal
+    # A change committed while the query runs must not be cached over
+    stamp = table_generations.snapshot(("users",))
+    user = await db.scalar(select(models.User).where(models.User.username == username))
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal(id=user.id, username=user.username, role=user.role, is_active=user.is_active)
+    if table_generations.snapshot(("users",)) == stamp:
+        principals.put(username, principal, AUTH_CACHE_TTL_SECONDS)
+    return principal
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-async def get_current_admin_user(current_user: models.User = Depends(get_current_active_user)):
+async def get_current_admin_user(current_user: Principal = Depends(get_current_active_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized")
     return current_user
@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import insert, select, update
+from . import models
+from .database import generations_engine
+
+# Report result cache
+#
+# Every table has a generation counter in the `table_generations` table. The
+# crud mutators bump it in the same transaction as their write, so the
+# counters are shared by every worker and can never get ahead of the data.
+# A cached result remembers the generations of the tables it was computed
+# from and is only served while they are unchanged, so a write through any
+# worker invalidates exactly the reports that read the written table.
+#
+# Reading the counters is cheap: on SQLite they are only queried again after
+# `PRAGMA data_version` shows that another connection committed something.
+
+class TableGenerations:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection = None
+        self._data_version = None
+        self._generations = {}
+
+    def bump(self, db, *tables: str):
+        """Count a write to `tables` as part of the session's transaction; call before committing."""
+        if not tables:
+            return
+        names = sorted(set(tables))
+        generation = models.TableGeneration
+        # A plain UPDATE, then an INSERT for counters that do not exist yet, so
+        # this runs on any backend
+        updated = db.execute(
+            update(generation)
+            .where(generation.name.in_(names))
+            .values(generation=generation.generation + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if updated < len(names):
+            existing = set(db.scalars(select(generation.name).where(generation.name.in_(names))))
+            # A new counter starts from the clock, so a recreated database does not
+            # repeat the generations (and ETags) of the one it replaced
+            start = time.time_ns() // 1_000_000
+            db.execute(insert(generation), [{"name": name, "generation": start} for name in names if name not in existing])
+
+    def snapshot(self, tables) -> tuple:
+        with self._lock:
+            self._refresh()
+            return tuple(self._generations.get(table, 0) for table in tables)
+
+    def _refresh(self):
+        if self._connection is None:
+            self._connection = generations_engine.raw_connection()
+        sqlite = generations_engine.dialect.name == "sqlite"
+        cursor = self._connection.cursor()
+        try:
+            if sqlite:
+                # Changes whenever another connection has committed since the last read
+                cursor.execute("PRAGMA data_version")
+                data_version = cursor.fetchone()[0]
+                if data_version == self._data_version:
+                    return
+            cursor.execute("SELECT name, generation FROM table_generations")
+            self._generations = dict(cursor.fetchall())
+            if sqlite:
+                self._data_version = data_version
+        finally:
+            cursor.close()
+            # End the read transaction, so the next read sees the latest commit
+            self._connection.rollback()
+
+class _Flight:
+    """A computation in progress that concurrent callers can wait on."""
+
+    def __init__(self, stamp: tuple):
+        self.stamp = stamp
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class _AsyncFlight(_Flight):
+    """A computation in progress that concurrent coroutines can await."""
+
+    def __init__(self, stamp: tuple):
+        super().__init__(stamp)
+        self.done = asyncio.Event()
+
+class ReportCache:
+    """Size-bounded LRU cache with table-generation invalidation and single-flight."""
+
+    def __init__(self, generations: TableGenerations, max_entries: int = 256):
+        self.generations = generations
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stamp, value)
+        self._inflight = {}
+        self._async_inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, tables: tuple, compute):
+        """Return the cached value for `key` or compute it once for all concurrent callers."""
+        with self._lock:
+            stamp = self.generations.snapshot(tables)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._inflight.get(key)
+            leader = flight is None or flight.stamp != stamp
+            if leader:
+                flight = _Flight(stamp)
+                self._inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                if flight.error is None:
+                    self._store(key, stamp, flight.value)
+            flight.done.set()
+        return flight.value
+
+    async def get_or_compute_async(self, key, tables: tuple, compute):
+        """Like get_or_compute, for async callers; `compute` returns an awaitable.
+
+        Waiting callers await the leader's result instead of blocking the event loop.
+        """
+        with self._lock:
+            stamp = self.generations.snapshot(tables)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            flight = self._async_inflight.get(key)
+            leader = flight is None or flight.stamp != stamp
+            if leader:
+                flight = _AsyncFlight(stamp)
+                self._async_inflight[key] = flight
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            await flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = await compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._async_inflight.get(key) is flight:
+                    del self._async_inflight[key]
+                if flight.error is None:
+                    self._store(key, stamp, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def _store(self, key, stamp: tuple, value):
+        self._entries[key] = (stamp, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+            }
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries also expire after their own time to live."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+table_generations = TableGenerations()
+report_cache = ReportCache(table_generations)
@@ -0,0 +1,122 @@
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+
+# Response compression
+#
+# ASGI middleware that compresses responses with gzip or deflate, whichever
+# the client prefers in Accept-Encoding. Bodies below `minimum_size` and
+# content that is already encoded or not text-like are sent untouched.
+# Streaming responses (the exports) are compressed chunk by chunk with a sync
+# flush after each one, so the client keeps receiving rows as they are
+# produced instead of waiting for the whole file.
+
+ENCODINGS = ("gzip", "deflate")
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/x-ndjson",
+    "application/vnd.farm.columnar+json",
+    "application/x-msgpack",
+)
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Pick gzip or deflate from an Accept-Encoding header, honouring q-values."""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    # On equal weights the earlier entry of ENCODINGS wins
+    q, _, encoding = max((weights.get(name, wildcard), -index, name) for index, name in enumerate(ENCODINGS))
+    return encoding if q > 0 else None
+
+def _compressor(encoding: str, level: int):
+    # gzip wraps the deflate stream in a gzip header; HTTP "deflate" means the zlib format
+    wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+    return zlib.compressobj(level, zlib.DEFLATED, wbits)
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, compresslevel: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressingSender(send, encoding, self.minimum_size, self.compresslevel)
+        await self.app(scope, receive, responder.send)
+
+class _CompressingSender:
+    def __init__(self, send, encoding: str, minimum_size: int, compresslevel: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.start = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _eligible(self, headers: MutableHeaders) -> bool:
+        if self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            # Hold the headers back until the first body chunk shows the size
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=list(self.start["headers"]))
+            eligible = self._eligible(headers)
+            if eligible:
+                headers.add_vary_header("Accept-Encoding")
+            if not eligible or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                self.start["headers"] = headers.raw
+                await self._send(self.start)
+                await self._send(message)
+                return
+
+            self.compressor = _compressor(self.encoding, self.compresslevel)
+            headers["Content-Encoding"] = self.encoding
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.compress(body) + self.compressor.flush()
+                headers["Content-Length"] = str(len(body))
+                self.start["headers"] = headers.raw
+                await self._send(self.start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            self.start["headers"] = headers.raw
+            await self._send(self.start)
+
+        if more_body:
+            body = self.compressor.compress(body) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        else:
+            body = self.compressor.compress(body) + self.compressor.flush()
+        await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
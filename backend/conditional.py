@@ -0,0 +1,52 @@
+import zlib
+from fastapi import Request, Response
+from .cache import table_generations
+
+# Conditional GET
+#
+# Read endpoints declare the tables they read. Their weak ETag is built from
+# the generation counters of those tables (bumped by the crud mutators after
+# every commit), so it is known before the handler runs. A request whose
+# If-None-Match still matches gets 304 Not Modified without touching the
+# database or serializing anything.
+#
+# The counters are kept in the database (see cache.TableGenerations), so a
+# write through any worker or the CLI importer changes the tag everywhere,
+# and tags stay valid across restarts.
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+def make_etag(tables: tuple, variant: str = None) -> str:
+    generations = table_generations.snapshot(tables)
+    tag = "-".join(str(generation) for generation in generations)
+    if variant:
+        # Representations negotiated from the same URL get distinct tags
+        tag += f"-{zlib.crc32(variant.encode('latin-1')):08x}"
+    return f'W/"{tag}"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    opaque = etag[2:]
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+def etag(*tables: str):
+    """Dependency that tags the response and short-circuits with 304 when the client is up to date."""
+    async def check(request: Request, response: Response):
+        tag = make_etag(tables, request.headers.get("accept"))
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, tag):
+            raise NotModified(tag)
+        response.headers["ETag"] = tag
+        # Let browsers keep the body but revalidate it on every use
+        response.headers["Cache-Control"] = "no-cache"
+    return check
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
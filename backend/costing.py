@@ -0,0 +1,289 @@
+import argparse
+import json
+import sys
+from collections import deque
+from sqlalchemy import func, or_, tuple_
+from sqlalchemy.orm import Session
+from typing import Optional
+from . import models
+from .cache import table_generations
+from .database import begin_write
+
+# Cost basis engine
+#
+# Replays each item's buy/sell ledger in (date, id) order and tracks both FIFO
+# lots and a weighted-average cost, giving COGS, realized margin and the value
+# of the remaining stock. All items are replayed in one ordered pass over the
+# transactions table, and the state of every item is checkpointed so the next
+# run only reads transactions recorded after the checkpoint.
+#
+# The highest transaction id a run has read is stored as well. The next run
+# reads only the rows past it, by primary key, so its cost follows the number
+# of new transactions rather than the size of the ledger. Runs hold the write
+# lock from the start, so runs from several workers take turns instead of
+# writing the same checkpoints at once.
+
+METHODS = ("fifo", "average")
+
+# Transactions fetched from the cursor per round trip
+YIELD_PER = 5000
+
+class ItemLedger:
+    """Running cost-basis state for one item."""
+
+    __slots__ = (
+        "item_id", "last_transaction_id", "last_date", "lots",
+        "average_quantity", "average_unit_cost", "sold_quantity",
+        "unmatched_quantity", "revenue", "fifo_cogs", "average_cogs",
+    )
+
+    def __init__(self, item_id: int, checkpoint: models.CostBasisCheckpoint = None):
+        self.item_id = item_id
+        if checkpoint is None:
+            self.last_transaction_id = None
+            self.last_date = None
+            self.lots = deque()
+            self.average_quantity = 0.0
+            self.average_unit_cost = 0.0
+            self.sold_quantity = 0.0
+            self.unmatched_quantity = 0.0
+            self.revenue = 0.0
+            self.fifo_cogs = 0.0
+            self.average_cogs = 0.0
+        else:
+            self.last_transaction_id = checkpoint.last_transaction_id
+            self.last_date = checkpoint.last_date
+            self.lots = deque(json.loads(checkpoint.fifo_lots or "[]"))
+            self.average_quantity = checkpoint.average_quantity
+            self.average_unit_cost = checkpoint.average_unit_cost
+            self.sold_quantity = checkpoint.sold_quantity
+            self.unmatched_quantity = checkpoint.unmatched_quantity
+            self.revenue = checkpoint.revenue
+            self.fifo_cogs = checkpoint.fifo_cogs
+            self.average_cogs = checkpoint.average_cogs
+
+    def buy(self, quantity: float, unit_cost: float):
+        if quantity <= 0:
+            return
+        self.lots.append([quantity, unit_cost])
+        total_quantity = self.average_quantity + quantity
+        self.average_unit_cost = (
+            self.average_quantity * self.average_unit_cost + quantity * unit_cost
+        ) / total_quantity
+        self.average_quantity = total_quantity
+
+    def sell(self, quantity: float, amount: float):
+        if quantity <= 0:
+            return
+        self.sold_quantity += quantity
+        self.revenue += amount
+
+        # FIFO: consume the oldest lots first
+        remaining = quantity
+        while remaining > 0 and self.lots:
+            lot = self.lots[0]
+            used = min(lot[0], remaining)
+            self.fifo_cogs += used * lot[1]
+            lot[0] -= used
+            remaining -= used
+            if lot[0] <= 0:
+                self.lots.popleft()
+
+        # Weighted average: cost at the current average
+        matched = min(quantity, self.average_quantity)
+        self.average_cogs += matched * self.average_unit_cost
+        self.average_quantity -= matched
+        if self.average_quantity <= 0:
+            self.average_quantity = 0.0
+            self.average_unit_cost = 0.0
+
+        # Stock sold without a recorded purchase (e.g. opening quantity) has no cost basis
+        self.unmatched_quantity += remaining
+
+    def to_checkpoint(self, db_checkpoint: models.CostBasisCheckpoint):
+        db_checkpoint.last_transaction_id = self.last_transaction_id
+        db_checkpoint.last_date = self.last_date
+        db_checkpoint.fifo_lots = json.dumps(list(self.lots))
+        db_checkpoint.average_quantity = self.average_quantity
+        db_checkpoint.average_unit_cost = self.average_unit_cost
+        db_checkpoint.sold_quantity = self.sold_quantity
+        db_checkpoint.unmatched_quantity = self.unmatched_quantity
+        db_checkpoint.revenue = self.revenue
+        db_checkpoint.fifo_cogs = self.fifo_cogs
+        db_checkpoint.average_cogs = self.average_cogs
+
+STATE_ID = 1
+
+def _reset_backdated(db: Session, watermark: int) -> list:
+    """Drop checkpoints of items that received transactions dated before the checkpoint.
+
+    Only transactions past `watermark` can be new, so only those are looked at.
+    Returns the ids of the items whose checkpoint was dropped.
+    """
+    checkpoint = models.CostBasisCheckpoint
+    transaction = models.Transaction
+    stale = db.query(checkpoint.item_id).join(
+        transaction, transaction.item_id == checkpoint.item_id
+    ).filter(
+        transaction.id > watermark,
+        tuple_(transaction.date, transaction.id) < tuple_(checkpoint.last_date, checkpoint.last_transaction_id),
+    ).distinct()
+    item_ids = [row.item_id for row in stale]
+    if item_ids:
+        db.query(checkpoint).filter(checkpoint.item_id.in_(item_ids)).delete(synchronize_session="fetch")
+    return item_ids
+
+def _watermark(db: Session) -> Optional[int]:
+    return db.query(models.CostBasisState.last_transaction_id).filter(models.CostBasisState.id == STATE_ID).scalar()
+
+def update(db: Session) -> int:
+    """Replay transactions recorded since the last checkpoints and store new ones.
+
+    Returns the number of transactions processed.
+    """
+    checkpoint = models.CostBasisCheckpoint
+    transaction = models.Transaction
+
+    latest = db.query(func.max(transaction.id)).scalar()
+    if latest is None or latest == _watermark(db):
+        return 0
+
+    begin_write(db)
+    # Nothing can be added while the lock is held, so every row up to `latest` gets replayed
+    watermark = _watermark(db)
+    latest = db.query(func.max(transaction.id)).scalar()
+    reset = _reset_backdated(db, watermark) if watermark is not None else []
+    checkpoints = {db_checkpoint.item_id: db_checkpoint for db_checkpoint in db.query(checkpoint)}
+
+    new_rows = db.query(
+        transaction.id,
+        transaction.item_id,
+        transaction.type,
+        transaction.quantity,
+        transaction.price_per_unit,
+        transaction.total_price,
+        transaction.date,
+    ).outerjoin(
+        checkpoint, checkpoint.item_id == transaction.item_id
+    ).filter(
+        or_(
+            checkpoint.item_id.is_(None),
+            tuple_(transaction.date, transaction.id) > tuple_(checkpoint.last_date, checkpoint.last_transaction_id),
+        )
+    )
+    item_order = transaction.item_id
+    if watermark is not None:
+        # Items whose checkpoint was just dropped are replayed from their first transaction
+        scope = transaction.id > watermark
+        if reset:
+            scope = or_(scope, transaction.item_id.in_(reset))
+        new_rows = new_rows.filter(scope)
+        # Sort the few new rows instead of letting SQLite walk the whole
+        # item_id index to get them in order; "+ 0" hides the index from ORDER BY
+        item_order = transaction.item_id + 0
+    new_rows = new_rows.order_by(item_order, transaction.date, transaction.id)
+
+    ledger = None
+    processed = 0
+    for row in new_rows.yield_per(YIELD_PER):
+        if ledger is None or ledger.item_id != row.item_id:
+            if ledger is not None:
+                _save(db, checkpoints, ledger)
+            ledger = ItemLedger(row.item_id, checkpoints.get(row.item_id))
+
+        quantity = row.quantity or 0
+        if row.type == "buy":
+            ledger.buy(quantity, row.price_per_unit or 0)
+        elif row.type == "sell":
+            ledger.sell(quantity, row.total_price or 0)
+        ledger.last_transaction_id = row.id
+        ledger.last_date = row.date
+        processed += 1
+
+    if ledger is not None:
+        _save(db, checkpoints, ledger)
+    db.merge(models.CostBasisState(id=STATE_ID, last_transaction_id=latest))
+    db.commit()
+    return processed
+
+def _save(db: Session, checkpoints: dict, ledger: ItemLedger):
+    db_checkpoint = checkpoints.get(ledger.item_id)
+    if db_checkpoint is None:
+        db_checkpoint = models.CostBasisCheckpoint(item_id=ledger.item_id)
+        db.add(db_checkpoint)
+        checkpoints[ledger.item_id] = db_checkpoint
+    ledger.to_checkpoint(db_checkpoint)
+
+def rebuild(db: Session) -> int:
+    """Discard all checkpoints and replay the full ledger."""
+    db.query(models.CostBasisCheckpoint).delete(synchronize_session="fetch")
+    db.query(models.CostBasisState).delete(synchronize_session="fetch")
+    # Cached cost-basis reports go stale; the next one replays the ledger like this rebuild does
+    table_generations.bump(db, "cost_basis_checkpoints")
+    db.commit()
+    return update(db)
+
+def cost_basis_report(db: Session, method: str = "fifo") -> dict:
+    """Per-item COGS, realized margin and remaining stock value, plus totals."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}', expected one of: {', '.join(METHODS)}")
+    update(db)
+
+    rows = db.query(models.CostBasisCheckpoint, models.Item.name).outerjoin(
+        models.Item, models.Item.id == models.CostBasisCheckpoint.item_id
+    ).order_by(models.CostBasisCheckpoint.item_id)
+
+    items = []
+    totals = {"revenue": 0.0, "cogs": 0.0, "realized_margin": 0.0, "remaining_value": 0.0}
+    for db_checkpoint, name in rows:
+        if method == "fifo":
+            lots = json.loads(db_checkpoint.fifo_lots or "[]")
+            cogs = db_checkpoint.fifo_cogs
+            remaining_quantity = sum(quantity for quantity, _ in lots)
+            remaining_value = sum(quantity * unit_cost for quantity, unit_cost in lots)
+        else:
+            cogs = db_checkpoint.average_cogs
+            remaining_quantity = db_checkpoint.average_quantity
+            remaining_value = db_checkpoint.average_quantity * db_checkpoint.average_unit_cost
+        realized_margin = db_checkpoint.revenue - cogs
+
+        items.append({
+            "item_id": db_checkpoint.item_id,
+            "name": name,
+            "sold_quantity": db_checkpoint.sold_quantity,
+            "unmatched_quantity": db_checkpoint.unmatched_quantity,
+            "revenue": round(db_checkpoint.revenue, 2),
+            "cogs": round(cogs, 2),
+            "realized_margin": round(realized_margin, 2),
+            "remaining_quantity": remaining_quantity,
+            "remaining_value": round(remaining_value, 2)
+        })
+        totals["revenue"] += db_checkpoint.revenue
+        totals["cogs"] += cogs
+        totals["realized_margin"] += realized_margin
+        totals["remaining_value"] += remaining_value
+
+    return {
+        "method": method,
+        "items": items,
+        "totals": {key: round(value, 2) for key, value in totals.items()}
+    }
+
+def main(argv=None):
+    from .database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Update or rebuild cost-basis checkpoints")
+    parser.add_argument("command", choices=["update", "rebuild"])
+    args = parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        processed = update(db) if args.command == "update" else rebuild(db)
+        print(f"Processed {processed} transactions")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,37 @@
+import json
+from pydantic import ValidationError
+from sqlalchemy import bindparam, delete, func, insert, update
 from sqlalchemy.orm import Session
-from . import models, schemas
+from typing import List, Optional
+from . import models, schemas, rollup, occupancy
+from .filters import (
+    apply_filters, sort_order,
+    TASK_FILTERS, TASK_SORTS, TRANSACTION_FILTERS, TRANSACTION_SORTS,
+    LAND_FILTERS, LAND_SORTS, CROP_FILTERS, CROP_SORTS,
+)
+from .pagination import paginate
+from .fieldsets import select
+from .cache import table_generations
 import datetime
 
+def _commit(db: Session, *tables: str):
+    """Commit and invalidate cached results that read any of `tables`, in every worker."""
+    table_generations.bump(db, *tables)
+    db.commit()
+
 # Farmer CRUD
 def get_farmer(db: Session, farmer_id: int):
     return db.query(models.Farmer).filter(models.Farmer.id == farmer_id).first()
 
-def get_farmers(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Farmer).offset(skip).limit(limit).all()
+def get_farmers(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None, fields: Optional[tuple] = None):
+    order = [(models.Farmer.id, False)]
+    return paginate(select(db, models.Farmer, fields, [models.Farmer.id]), order, skip=skip, limit=limit, after=after)
 
 def create_farmer(db: Session, farmer: schemas.FarmerCreate):
     db_farmer = models.Farmer(**farmer.model_dump())
     db.add(db_farmer)
-    db.commit()
+    rollup.apply(db, farmers=1)
+    _commit(db, "farmers")
     db.refresh(db_farmer)
     return db_farmer
 
@@ -21,7 +40,7 @@ def update_farmer(db: Session, farmer_id: int, farmer: schemas.FarmerCreate):
     if db_farmer:
         for key, value in farmer.model_dump().items():
             setattr(db_farmer, key, value)
-        db.commit()
+        _commit(db, "farmers")
         db.refresh(db_farmer)
     return db_farmer
 
@@ -29,26 +48,36 @@ def delete_farmer(db: Session, farmer_id: int):
     db_farmer = get_farmer(db, farmer_id)
     if db_farmer:
         db.delete(db_farmer)
-        db.commit()
+        rollup.apply(db, farmers=-1)
+        _commit(db, "farmers")
     return db_farmer
 
 # Task CRUD
-def get_tasks(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Task).offset(skip).limit(limit).all()
+def get_tasks(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: str = "id", filters: Optional[dict] = None):
+    query = apply_filters(db.query(models.Task), TASK_FILTERS, filters)
+    order = sort_order(TASK_SORTS, sort, models.Task.id)
+    return paginate(query, order, skip=skip, limit=limit, after=after)
 
 def create_task(db: Session, task: schemas.TaskCreate):
     db_task = models.Task(**task.model_dump())
     db.add(db_task)
-    db.commit()
+    rollup.apply(db, **rollup.task_deltas(db_task.status or "Pending"))
+    _commit(db, "tasks")
     db.refresh(db_task)
     return db_task
 
 def update_task(db: Session, task_id: int, task: schemas.TaskBase): # Using TaskBase for update to allow partial updates if needed, but here simple
     db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
     if db_task:
+        old_status = db_task.status
         for key, value in task.model_dump(exclude_unset=True).items():
             setattr(db_task, key, value)
-        db.commit()
+        if db_task.status != old_status:
+            rollup.apply(db, **rollup.merge_deltas(
+                rollup.task_deltas(old_status, -1),
+                rollup.task_deltas(db_task.status),
+            ))
+        _commit(db, "tasks")
         db.refresh(db_task)
     return db_task
 
@@ -56,26 +85,33 @@ def delete_task(db: Session, task_id: int):
     db_task = db.query(models.Task).filter(models.Task.id == task_id).first()
     if db_task:
         db.delete(db_task)
-        db.commit()
+        rollup.apply(db, **rollup.task_deltas(db_task.status, -1))
+        _commit(db, "tasks")
     return db_task
 
 # Item CRUD
-def get_items(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Item).offset(skip).limit(limit).all()
+def _inventory_value(db_item: models.Item) -> float:
+    return (db_item.quantity or 0) * (db_item.price or 0)
+
+def get_items(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    return paginate(db.query(models.Item), [(models.Item.id, False)], skip=skip, limit=limit, after=after)
 
 def create_item(db: Session, item: schemas.ItemCreate):
     db_item = models.Item(**item.model_dump())
     db.add(db_item)
-    db.commit()
+    rollup.apply(db, items=1, inventory_value=_inventory_value(db_item))
+    _commit(db, "items")
     db.refresh(db_item)
     return db_item
 
 def update_item(db: Session, item_id: int, item: schemas.ItemCreate):
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
     if db_item:
+        old_value = _inventory_value(db_item)
         for key, value in item.model_dump().items():
             setattr(db_item, key, value)
-        db.commit()
+        rollup.apply(db, inventory_value=_inventory_value(db_item) - old_value)
+        _commit(db, "items")
         db.refresh(db_item)
     return db_item
 
@@ -83,39 +119,171 @@ def delete_item(db: Session, item_id: int):
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first()
     if db_item:
         db.delete(db_item)
-        db.commit()
+        # Item ids can be reused, so the stock history and cost basis go with the item
+        db.execute(delete(models.ItemStockSnapshot).where(models.ItemStockSnapshot.item_id == item_id))
+        db.execute(delete(models.CostBasisCheckpoint).where(models.CostBasisCheckpoint.item_id == item_id))
+        rollup.apply(db, items=-1, inventory_value=-_inventory_value(db_item))
+        _commit(db, "items")
     return db_item
 
 # Transaction CRUD
+class InsufficientStock(ValueError):
+    """A sale asked for more than the item has in stock."""
+    def __init__(self, item_id: int, requested: int, available: int):
+        super().__init__(f"Insufficient stock for item {item_id}: {requested} requested, {available} available")
+        self.item_id = item_id
+        self.requested = requested
+        self.available = available
+
+def _stock_delta(transaction) -> int:
+    if transaction.type == "buy":
+        return transaction.quantity
+    if transaction.type == "sell":
+        return -transaction.quantity
+    return 0
+
+def _move_stock(db: Session, item_id: int, delta: int):
+    """Add `delta` to an item's stock in one statement and return the item's price row.
+
+    A decrease only applies while the stock covers it, so concurrent sales
+    can neither lose updates nor take the stock below zero. Returns None when
+    no row was updated: the item is missing or the stock is too low.
+    """
+    items = models.Item.__table__
+    stock = func.coalesce(items.c.quantity, 0)
+    statement = update(items).where(items.c.id == item_id).values(quantity=stock + delta)
+    if delta < 0:
+        statement = statement.where(stock >= -delta)
+    return db.execute(statement.returning(items.c.price)).first()
+
 def create_transaction(db: Session, transaction: schemas.TransactionCreate):
+    """Record a transaction and move the item's stock in the same database transaction.
+
+    Raises InsufficientStock when a sale exceeds the stock.
+    """
     # Calculate total price
     total_price = transaction.quantity * transaction.price_per_unit
-    db_transaction = models.Transaction(**transaction.model_dump(), total_price=total_price)
+    record = {**transaction.model_dump(), "total_price": total_price, "date": datetime.datetime.utcnow()}
+    db_transaction = models.Transaction(**record)
     
     # Update item quantity
-    db_item = db.query(models.Item).filter(models.Item.id == transaction.item_id).first()
-    if db_item:
-        if transaction.type == "buy":
-            db_item.quantity += transaction.quantity
-        elif transaction.type == "sell":
-            db_item.quantity -= transaction.quantity
+    deltas = {"transactions": 1}
+    delta = _stock_delta(transaction)
+    if delta:
+        moved = _move_stock(db, transaction.item_id, delta)
+        if moved is not None:
+            deltas["inventory_value"] = delta * (moved.price or 0)
+        else:
+            available = db.query(models.Item.quantity).filter(models.Item.id == transaction.item_id).first()
+            if available is not None:
+                db.rollback()
+                raise InsufficientStock(transaction.item_id, transaction.quantity, available.quantity or 0)
+    if transaction.type == "buy":
+        deltas.update(purchases=1, purchase_amount=total_price)
+    elif transaction.type == "sell":
+        deltas.update(sales=1, sales_amount=total_price)
     
     db.add(db_transaction)
-    db.commit()
+    rollup.apply(db, **deltas)
+    rollup.apply_daily(db, rollup.daily_deltas([record]))
+    _commit(db, "transactions", "items")
     db.refresh(db_transaction)
     return db_transaction
 
-def get_transactions(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Transaction).offset(skip).limit(limit).all()
+class _StockChanged(Exception):
+    """Another writer moved an item's stock between reading and updating it."""
+
+# Batches are re-read and re-applied at most this often when their stock reads go stale
+BATCH_ATTEMPTS = 5
+
+def create_transactions_batch(db: Session, transactions: list) -> list:
+    """Record queued transactions with a single commit, in arrival order.
+
+    Returns one entry per transaction: the recorded row as a dict, or an
+    InsufficientStock error for a sale the stock could not cover at its
+    place in the batch.
+    """
+    for attempt in range(BATCH_ATTEMPTS):
+        try:
+            return _create_transactions_batch(db, transactions)
+        except _StockChanged:
+            db.rollback()
+            if attempt == BATCH_ATTEMPTS - 1:
+                raise
+
+def _create_transactions_batch(db: Session, transactions: list) -> list:
+    item_ids = list({transaction.item_id for transaction in transactions})
+    stock = {
+        item_id: [quantity or 0, price or 0]
+        for item_id, quantity, price in _select_by_ids(
+            db, (models.Item.id, models.Item.quantity, models.Item.price), models.Item.id, item_ids
+        )
+    }
+    read = {item_id: quantity for item_id, (quantity, _) in stock.items()}
+
+    # Replay the batch against the stock read above, one transaction at a time
+    now = datetime.datetime.utcnow()
+    results, records = [], []
+    deltas = {"transactions": 0, "purchases": 0, "purchase_amount": 0, "sales": 0, "sales_amount": 0, "inventory_value": 0}
+    for transaction in transactions:
+        delta = _stock_delta(transaction)
+        item = stock.get(transaction.item_id)
+        if item is not None and delta < 0 and item[0] + delta < 0:
+            results.append(InsufficientStock(transaction.item_id, transaction.quantity, item[0]))
+            continue
+        if item is not None:
+            item[0] += delta
+            deltas["inventory_value"] += delta * item[1]
+        record = {**transaction.model_dump(), "total_price": transaction.quantity * transaction.price_per_unit, "date": now}
+        deltas["transactions"] += 1
+        if transaction.type == "buy":
+            deltas["purchases"] += 1
+            deltas["purchase_amount"] += record["total_price"]
+        elif transaction.type == "sell":
+            deltas["sales"] += 1
+            deltas["sales_amount"] += record["total_price"]
+        results.append(record)
+        records.append(record)
+
+    # One UPDATE per item, applied only if nobody moved the stock since it was read
+    changed = [
+        {"b_item_id": item_id, "b_read": read[item_id], "b_quantity": quantity}
+        for item_id, (quantity, _) in stock.items()
+        if quantity != read[item_id]
+    ]
+    if changed:
+        items = models.Item.__table__
+        updated = db.execute(
+            update(items)
+            .where(items.c.id == bindparam("b_item_id"), func.coalesce(items.c.quantity, 0) == bindparam("b_read"))
+            .values(quantity=bindparam("b_quantity")),
+            changed,
+        ).rowcount
+        if updated != len(changed):
+            raise _StockChanged()
+
+    for record, row_id in zip(records, _bulk_insert(db, models.Transaction, records)):
+        record["id"] = row_id
+    rollup.apply(db, **deltas)
+    rollup.apply_daily(db, rollup.daily_deltas(records))
+    _commit(db, "transactions", "items")
+    return results
+
+def get_transactions(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: str = "id", filters: Optional[dict] = None, fields: Optional[tuple] = None):
+    order = sort_order(TRANSACTION_SORTS, sort, models.Transaction.id)
+    query = select(db, models.Transaction, fields, [column for column, _ in order])
+    query = apply_filters(query, TRANSACTION_FILTERS, filters)
+    return paginate(query, order, skip=skip, limit=limit, after=after)
 
 # Asset CRUD
-def get_assets(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Asset).offset(skip).limit(limit).all()
+def get_assets(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None):
+    return paginate(db.query(models.Asset), [(models.Asset.id, False)], skip=skip, limit=limit, after=after)
 
 def create_asset(db: Session, asset: schemas.AssetCreate):
     db_asset = models.Asset(**asset.model_dump())
     db.add(db_asset)
-    db.commit()
+    rollup.apply(db, assets=1, asset_value=db_asset.value or 0)
+    _commit(db, "assets")
     db.refresh(db_asset)
     return db_asset
 
@@ -123,12 +291,16 @@ def delete_asset(db: Session, asset_id: int):
     db_asset = db.query(models.Asset).filter(models.Asset.id == asset_id).first()
     if db_asset:
         db.delete(db_asset)
-        db.commit()
+        rollup.apply(db, assets=-1, asset_value=-(db_asset.value or 0))
+        _commit(db, "assets")
     return db_asset
 
 # Land CRUD
-def get_lands(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Land).offset(skip).limit(limit).all()
+def get_lands(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: str = "id", filters: Optional[dict] = None, fields: Optional[tuple] = None):
+    order = sort_order(LAND_SORTS, sort, models.Land.id)
+    query = select(db, models.Land, fields, [column for column, _ in order])
+    query = apply_filters(query, LAND_FILTERS, filters)
+    return paginate(query, order, skip=skip, limit=limit, after=after)
 
 def get_land(db: Session, land_id: int):
     return db.query(models.Land).filter(models.Land.id == land_id).first()
@@ -136,7 +308,7 @@ def get_land(db: Session, land_id: int):
 def create_land(db: Session, land: schemas.LandCreate):
     db_land = models.Land(**land.model_dump())
     db.add(db_land)
-    db.commit()
+    _commit(db, "lands")
     db.refresh(db_land)
     return db_land
 
@@ -145,7 +317,7 @@ def update_land(db: Session, land_id: int, land: schemas.LandUpdate):
     if db_land:
         for key, value in land.model_dump(exclude_unset=True).items():
             setattr(db_land, key, value)
-        db.commit()
+        _commit(db, "lands")
         db.refresh(db_land)
     return db_land
 
@@ -153,20 +325,23 @@ def delete_land(db: Session, land_id: int):
     db_land = get_land(db, land_id)
     if db_land:
         db.delete(db_land)
-        db.commit()
+        _commit(db, "lands")
     return db_land
 
 def assign_land_to_farmer(db: Session, land_id: int, farmer_id: int):
     db_land = get_land(db, land_id)
     if db_land:
         db_land.farmer_id = farmer_id
-        db.commit()
+        _commit(db, "lands")
         db.refresh(db_land)
     return db_land
 
 # Crop CRUD
-def get_crops(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Crop).offset(skip).limit(limit).all()
+def get_crops(db: Session, skip: int = 0, limit: int = 100, after: Optional[str] = None, sort: str = "id", filters: Optional[dict] = None, fields: Optional[tuple] = None):
+    order = sort_order(CROP_SORTS, sort, models.Crop.id)
+    query = select(db, models.Crop, fields, [column for column, _ in order])
+    query = apply_filters(query, CROP_FILTERS, filters)
+    return paginate(query, order, skip=skip, limit=limit, after=after)
 
 def get_crop(db: Session, crop_id: int):
     return db.query(models.Crop).filter(models.Crop.id == crop_id).first()
@@ -174,19 +349,47 @@ def get_crop(db: Session, crop_id: int):
 def get_crops_by_land(db: Session, land_id: int):
     return db.query(models.Crop).filter(models.Crop.land_id == land_id).all()
 
+def get_upcoming_crops_by_land(db: Session, land_id: int, days: int = 120):
+    """Crops on a land planted from now on and harvested within `days` (about 4 months)."""
+    current_date = datetime.datetime.utcnow()
+    return db.query(models.Crop).filter(
+        models.Crop.land_id == land_id,
+        models.Crop.planting_date >= current_date,
+        models.Crop.expected_harvest_date <= current_date + datetime.timedelta(days=days)
+    ).all()
+
+def _check_planting(db: Session, db_crop: models.Crop):
+    """Refuse `db_crop` if it overlaps another planting on its land or ends before it starts.
+
+    Raises occupancy.CropConflict or occupancy.InvalidPlanting.
+
+    The row is written first, so the check runs while this session holds the
+    write lock and no concurrent planting can slip in between.
+    """
+    db.flush()
+    try:
+        occupancy.check(db, db_crop.land_id, db_crop.planting_date, db_crop.expected_harvest_date, exclude=[db_crop.id])
+    except (occupancy.CropConflict, occupancy.InvalidPlanting):
+        db.rollback()
+        raise
+
 def create_crop(db: Session, crop: schemas.CropCreate):
     db_crop = models.Crop(**crop.model_dump())
     db.add(db_crop)
-    db.commit()
+    _check_planting(db, db_crop)
+    _commit(db, "crops")
     db.refresh(db_crop)
     return db_crop
 
 def update_crop(db: Session, crop_id: int, crop: schemas.CropUpdate):
     db_crop = get_crop(db, crop_id)
     if db_crop:
-        for key, value in crop.model_dump(exclude_unset=True).items():
+        values = crop.model_dump(exclude_unset=True)
+        for key, value in values.items():
             setattr(db_crop, key, value)
-        db.commit()
+        if "planting_date" in values or "expected_harvest_date" in values:
+            _check_planting(db, db_crop)
+        _commit(db, "crops")
         db.refresh(db_crop)
     return db_crop
 
@@ -194,5 +397,246 @@ def delete_crop(db: Session, crop_id: int):
     db_crop = get_crop(db, crop_id)
     if db_crop:
         db.delete(db_crop)
-        db.commit()
+        _commit(db, "crops")
     return db_crop
+
+# Bulk CRUD
+#
+# Bulk writes validate every row in one pass, insert/update/delete the valid
+# rows with executemany statements and commit once. The result lists the
+# generated (or affected) id for each input row, None where the row failed,
+# together with per-row errors.
+
+# Keeps IN (...) lists well below SQLite's bound parameter limit
+_IN_CHUNK = 500
+
+def _bulk_validate(rows: list, schema):
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, schema.model_validate(row)))
+        except ValidationError as e:
+            errors.append({"index": index, "detail": json.loads(e.json(include_url=False))})
+    return valid, errors
+
+def _bulk_result(total: int, done: list, errors: list) -> dict:
+    ids = [None] * total
+    for index, row_id in done:
+        ids[index] = row_id
+    return {"ids": ids, "errors": sorted(errors, key=lambda error: error["index"])}
+
+def _bulk_insert(db: Session, model, records: list) -> list:
+    if not records:
+        return []
+    return list(db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), records))
+
+def _chunks(values: list):
+    for start in range(0, len(values), _IN_CHUNK):
+        yield values[start:start + _IN_CHUNK]
+
+def _select_by_ids(db: Session, columns: tuple, key, ids) -> list:
+    ids = list(set(ids))
+    rows = []
+    for chunk in _chunks(ids):
+        rows.extend(db.query(*columns).filter(key.in_(chunk)).all())
+    return rows
+
+def _existing_ids(db: Session, key, ids) -> set:
+    return {row[0] for row in _select_by_ids(db, (key,), key, ids)}
+
+def _require_existing(db: Session, valid: list, errors: list, field: str, key, label: str) -> list:
+    """Drop rows whose `field` points at a missing row and record an error for each."""
+    wanted = [getattr(row, field) for _, row in valid if getattr(row, field) is not None]
+    existing = _existing_ids(db, key, wanted)
+    kept = []
+    for index, row in valid:
+        value = getattr(row, field)
+        if value is not None and value not in existing:
+            errors.append({"index": index, "detail": f"{label} {value} not found"})
+        else:
+            kept.append((index, row))
+    return kept
+
+def _bulk_create(db: Session, model, valid: list, errors: list, total: int, records: list = None) -> dict:
+    records = records if records is not None else [row.model_dump() for _, row in valid]
+    ids = _bulk_insert(db, model, records)
+    return _bulk_result(total, list(zip([index for index, _ in valid], ids)), errors)
+
+def _drop_repeated_ids(model, valid: list, errors: list) -> list:
+    """Keep the first row for each id; later rows for it become row errors."""
+    kept, seen = [], set()
+    for index, row in valid:
+        if row.id in seen:
+            errors.append({"index": index, "detail": f"{model.__name__} {row.id} listed more than once"})
+        else:
+            kept.append((index, row))
+            seen.add(row.id)
+    return kept
+
+def _bulk_update(db: Session, model, valid: list, errors: list, total: int, table: str, existing: set = None) -> dict:
+    valid = _drop_repeated_ids(model, valid, errors)
+    if existing is None:
+        existing = _existing_ids(db, model.id, [row.id for _, row in valid])
+    updates, done = [], []
+    for index, row in valid:
+        if row.id not in existing:
+            errors.append({"index": index, "detail": f"{model.__name__} {row.id} not found"})
+            continue
+        values = row.model_dump(exclude_unset=True)
+        if len(values) > 1:
+            updates.append(values)
+        done.append((index, row.id))
+    if updates:
+        db.execute(update(model), updates)
+    _commit(db, table)
+    return _bulk_result(total, done, errors)
+
+def _bulk_delete(db: Session, model, ids: List[int], table: str, existing: set = None, **rollup_deltas) -> dict:
+    if existing is None:
+        existing = _existing_ids(db, model.id, ids)
+    for chunk in _chunks(list(existing)):
+        db.execute(delete(model).where(model.id.in_(chunk)).execution_options(synchronize_session=False))
+    rollup.apply(db, **rollup_deltas)
+    _commit(db, table)
+    done, errors, seen = [], [], set()
+    for index, row_id in enumerate(ids):
+        if row_id in seen:
+            errors.append({"index": index, "detail": f"{model.__name__} {row_id} listed more than once"})
+        elif row_id in existing:
+            done.append((index, row_id))
+            seen.add(row_id)
+        else:
+            errors.append({"index": index, "detail": f"{model.__name__} {row_id} not found"})
+    return _bulk_result(len(ids), done, errors)
+
+def bulk_create_farmers(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.FarmerCreate)
+    result = _bulk_create(db, models.Farmer, valid, errors, len(rows))
+    rollup.apply(db, farmers=len(valid))
+    _commit(db, "farmers")
+    return result
+
+def bulk_delete_farmers(db: Session, ids: List[int]):
+    existing = _existing_ids(db, models.Farmer.id, ids)
+    return _bulk_delete(db, models.Farmer, ids, "farmers", existing=existing, farmers=-len(existing))
+
+def bulk_create_tasks(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.TaskCreate)
+    valid = _require_existing(db, valid, errors, "farmer_id", models.Farmer.id, "Farmer")
+    result = _bulk_create(db, models.Task, valid, errors, len(rows))
+    rollup.apply(db, **rollup.merge_deltas(*[rollup.task_deltas(task.status or "Pending") for _, task in valid]))
+    _commit(db, "tasks")
+    return result
+
+def bulk_update_tasks(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.TaskBulkUpdate)
+    # Rollup deltas are taken against the status before the batch, so each task may appear once
+    valid = _drop_repeated_ids(models.Task, valid, errors)
+    old_statuses = dict(_select_by_ids(
+        db, (models.Task.id, models.Task.status), models.Task.id, [task.id for _, task in valid]
+    ))
+    deltas = [
+        rollup.merge_deltas(rollup.task_deltas(old_statuses[task.id], -1), rollup.task_deltas(task.status))
+        for _, task in valid
+        if task.id in old_statuses and "status" in task.model_fields_set and task.status != old_statuses[task.id]
+    ]
+    rollup.apply(db, **rollup.merge_deltas(*deltas))
+    return _bulk_update(db, models.Task, valid, errors, len(rows), "tasks", existing=set(old_statuses))
+
+def bulk_delete_tasks(db: Session, ids: List[int]):
+    statuses = dict(_select_by_ids(db, (models.Task.id, models.Task.status), models.Task.id, ids))
+    deltas = rollup.merge_deltas(*[rollup.task_deltas(status, -1) for status in statuses.values()])
+    return _bulk_delete(db, models.Task, ids, "tasks", existing=set(statuses), **deltas)
+
+def bulk_create_lands(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.LandCreate)
+    valid = _require_existing(db, valid, errors, "farmer_id", models.Farmer.id, "Farmer")
+    result = _bulk_create(db, models.Land, valid, errors, len(rows))
+    _commit(db, "lands")
+    return result
+
+def bulk_update_lands(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.LandBulkUpdate)
+    return _bulk_update(db, models.Land, valid, errors, len(rows), "lands")
+
+def bulk_delete_lands(db: Session, ids: List[int]):
+    return _bulk_delete(db, models.Land, ids, "lands")
+
+def _drop_conflicting_plantings(db: Session, plantings: list, errors: list) -> set:
+    """Check `(index, crop_id, land_id, start, end)` plantings against the stored ones and each other.
+
+    Returns the indexes of the rows that overlap or end before they start, and
+    records an error for each.
+    The stored plantings are taken as they were before the batch; crops the
+    batch moves are only excluded from their own check.
+    """
+    batch, dropped = occupancy.PlantingIndex(), set()
+    for index, crop_id, land_id, start, end in plantings:
+        if start is None or end is None:
+            continue
+        try:
+            occupancy.require_interval(start, end)
+        except occupancy.InvalidPlanting as e:
+            errors.append({"index": index, "detail": str(e)})
+            dropped.add(index)
+            continue
+        conflicts = occupancy.overlapping(db, land_id, start, end, exclude=[crop_id] if crop_id else ())
+        if conflicts or batch.overlapping(land_id, start, end):
+            detail = str(occupancy.CropConflict(land_id, conflicts)) if conflicts else \
+                f"Land {land_id} is already planted in that period by another row of this batch"
+            errors.append({"index": index, "detail": detail})
+            dropped.add(index)
+        else:
+            batch.add(land_id, start, end)
+    return dropped
+
+def bulk_create_crops(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.CropCreate)
+    valid = _require_existing(db, valid, errors, "land_id", models.Land.id, "Land")
+    dropped = _drop_conflicting_plantings(
+        db, [(index, None, row.land_id, row.planting_date, row.expected_harvest_date) for index, row in valid], errors
+    )
+    valid = [(index, row) for index, row in valid if index not in dropped]
+    result = _bulk_create(db, models.Crop, valid, errors, len(rows))
+    _commit(db, "crops")
+    return result
+
+def bulk_update_crops(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.CropBulkUpdate)
+    valid = _drop_repeated_ids(models.Crop, valid, errors)
+    moved = [(index, row) for index, row in valid if {"planting_date", "expected_harvest_date"} & row.model_fields_set]
+    current = {
+        crop_id: (land_id, start, end)
+        for crop_id, land_id, start, end in _select_by_ids(
+            db, (models.Crop.id, models.Crop.land_id, models.Crop.planting_date, models.Crop.expected_harvest_date),
+            models.Crop.id, [row.id for _, row in moved],
+        )
+    }
+    plantings = []
+    for index, row in moved:
+        if row.id in current:
+            land_id, start, end = current[row.id]
+            values = row.model_dump(exclude_unset=True)
+            plantings.append((index, row.id, land_id, values.get("planting_date", start), values.get("expected_harvest_date", end)))
+    dropped = _drop_conflicting_plantings(db, plantings, errors)
+    valid = [(index, row) for index, row in valid if index not in dropped]
+    return _bulk_update(db, models.Crop, valid, errors, len(rows), "crops")
+
+def bulk_delete_crops(db: Session, ids: List[int]):
+    return _bulk_delete(db, models.Crop, ids, "crops")
+
+def bulk_create_transactions(db: Session, rows: list):
+    valid, errors = _bulk_validate(rows, schemas.TransactionCreate)
+    valid = _require_existing(db, valid, errors, "item_id", models.Item.id, "Item")
+
+    # Replay the rows in order like queued transactions: a sale is refused only
+    # when the stock at its place in the batch cannot cover it
+    results = create_transactions_batch(db, [transaction for _, transaction in valid])
+    done = []
+    for (index, _), result in zip(valid, results):
+        if isinstance(result, InsufficientStock):
+            errors.append({"index": index, "detail": str(result)})
+        else:
+            done.append((index, result["id"]))
+    return _bulk_result(len(rows), done, errors)
+
@@ -1,13 +1,126 @@
-from sqlalchemy import create_engine
+import asyncio
+import os
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./farm.db"
+# Engine configuration
+#
+# Everything can be overridden from the environment. SQLite connections are set
+# up on connect with WAL journaling, so readers and the writer no longer block
+# each other, with synchronous=NORMAL (one fsync per checkpoint instead of two
+# per commit), a busy timeout instead of immediate "database is locked" errors,
+# and a memory-mapped, larger page cache.
+#
+# Read-only routes use a second engine that opens the same file read-only
+# (`mode=ro`), with a pool sized to the number of cores. In WAL mode their
+# queries run against a snapshot and never hold up writes.
+#
+# The API routers use async engines on the same files (aiosqlite), so a
+# request waiting on SQLite does not hold a worker thread. The sync engines
+# remain for the command line tools, the CSV import and the streaming exports.
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./farm.db")
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are in KiB, so this is a 64 MB page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-64000"))
+
+READ_POOL_SIZE = int(os.getenv("DATABASE_READ_POOL_SIZE", str(os.cpu_count() or 4)))
+
+def _is_sqlite(url) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _async_url(url: str) -> str:
+    """The async driver URL for `url`; other backends must set ASYNC_DATABASE_URL."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.get_driver_name() == "pysqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+def _read_only_url(url: str) -> str:
+    """The SQLite URL opened read-only through a `file:` URI."""
+    parsed = make_url(url)
+    if not parsed.database or parsed.database == ":memory:":
+        return url
+    return parsed.set(
+        database=f"file:{parsed.database}",
+        query={**parsed.query, "mode": "ro", "uri": "true"},
+    ).render_as_string(hide_password=False)
+
+def _sqlite_pragmas(read_only: bool):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            # The journal mode is stored in the database file; only the writer sets it
+            if not read_only:
+                cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+                cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+            else:
+                cursor.execute("PRAGMA query_only=ON")
+            cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        finally:
+            cursor.close()
+    return set_pragmas
+
+READ_DATABASE_URL = os.getenv(
+    "DATABASE_READ_URL",
+    _read_only_url(SQLALCHEMY_DATABASE_URL) if _is_sqlite(SQLALCHEMY_DATABASE_URL) else SQLALCHEMY_DATABASE_URL,
 )
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_url(SQLALCHEMY_DATABASE_URL))
+ASYNC_READ_DATABASE_URL = os.getenv("ASYNC_DATABASE_READ_URL", _async_url(READ_DATABASE_URL))
+
+if _is_sqlite(SQLALCHEMY_DATABASE_URL):
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    )
+    event.listen(engine, "connect", _sqlite_pragmas(read_only=False))
+
+    read_engine = create_engine(
+        READ_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_POOL_SIZE,
+    )
+    event.listen(read_engine, "connect", _sqlite_pragmas(read_only=True))
+
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    event.listen(async_engine.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+    async_read_engine = create_async_engine(
+        ASYNC_READ_DATABASE_URL, pool_size=READ_POOL_SIZE, max_overflow=READ_POOL_SIZE
+    )
+    event.listen(async_read_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+
+    # One read-only connection of its own for the table generation counters
+    # (cache.py), which are checked before every cached or tagged response
+    generations_engine = create_engine(
+        READ_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    event.listen(generations_engine, "connect", _sqlite_pragmas(read_only=True))
+else:
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    read_engine = create_engine(READ_DATABASE_URL, pool_size=READ_POOL_SIZE)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+    async_read_engine = create_async_engine(ASYNC_READ_DATABASE_URL, pool_size=READ_POOL_SIZE)
+    generations_engine = create_engine(READ_DATABASE_URL, pool_size=1)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine, info={"read_only": True})
+
+# Objects must stay readable after commit: a lazy refresh cannot run outside the session's greenlet
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autoflush=False, expire_on_commit=False, info={"read_only": True}
+)
 
 Base = declarative_base()
 
@@ -17,3 +130,57 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db():
+    """A session on the read-only pool, for routes that never write."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """An AsyncSession for the API routers.
+
+    Existing crud functions run on it with `await db.run_sync(crud.function, ...)`.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    """An AsyncSession on the read-only pool."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+# How often a write that still finds SQLite locked after busy_timeout is retried
+WRITE_RETRIES = 5
+
+def _is_busy(error: OperationalError) -> bool:
+    message = str(error.orig).lower()
+    return "locked" in message or "busy" in message
+
+async def run_write(db, write, *args, **kwargs):
+    """Run the sync `write(session, ...)` on an AsyncSession, retrying while the database is locked.
+
+    The whole unit of work is rolled back and run again, with a growing
+    pause between attempts that does not block the event loop.
+    """
+    for attempt in range(WRITE_RETRIES):
+        try:
+            return await db.run_sync(write, *args, **kwargs)
+        except OperationalError as e:
+            await db.rollback()
+            if attempt == WRITE_RETRIES - 1 or not _is_busy(e):
+                raise
+            await asyncio.sleep(0.01 * 2 ** attempt)
+
+def begin_snapshot(db):
+    """Open the session's transaction now so the queries that follow all read one snapshot."""
+    if db.bind.dialect.name == "sqlite":
+        # pysqlite only begins a transaction before a write; reads would each see the latest commit
+        db.execute(text("BEGIN"))
+
+def begin_write(db):
+    """Open the session's transaction now with the write lock, so concurrent writers of the same state take turns."""
+    if db.bind.dialect.name == "sqlite":
+        db.execute(text("BEGIN IMMEDIATE"))
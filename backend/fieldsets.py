@@ -0,0 +1,54 @@
+from typing import List, Optional
+from fastapi import Response
+from pydantic import TypeAdapter, create_model
+from .filters import InvalidQuery
+from .responses import encoded_response
+
+# Sparse fieldsets
+#
+# `?fields=id,name` restricts a list endpoint to the named columns. The SELECT
+# only reads those columns (plus the keys pagination orders by), rows come
+# back as plain tuples instead of ORM objects, and they are validated and
+# serialized by a response model generated for exactly that subset.
+
+_adapters = {}
+
+def parse_fields(fields: Optional[str], schema) -> Optional[tuple]:
+    """Split `fields` and check each name against `schema`, keeping schema order."""
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(schema.model_fields)
+    if unknown:
+        raise InvalidQuery(
+            f"Unknown field(s) {', '.join(sorted(unknown))}, expected any of: {', '.join(schema.model_fields)}"
+        )
+    if not requested:
+        raise InvalidQuery("fields must name at least one field")
+    return tuple(name for name in schema.model_fields if name in requested)
+
+def select(db, model, fields: Optional[tuple], order_columns=()):
+    """A query for whole `model` rows, or only `fields` plus the ordering columns."""
+    if fields is None:
+        return db.query(model)
+    names = list(fields) + [column.key for column in order_columns if column.key not in fields]
+    return db.query(*[getattr(model, name) for name in names])
+
+def subset_adapter(schema, fields: tuple) -> TypeAdapter:
+    """A cached list adapter for a model holding only `fields` of `schema`."""
+    key = (schema, fields)
+    adapter = _adapters.get(key)
+    if adapter is None:
+        definitions = {
+            name: (schema.model_fields[name].annotation, schema.model_fields[name])
+            for name in fields
+        }
+        subset = create_model(f"{schema.__name__}Fields", **definitions)
+        adapter = TypeAdapter(List[subset])
+        _adapters[key] = adapter
+    return adapter
+
+def respond(rows, schema, fields: tuple, response: Response) -> Response:
+    """Serialize column rows with the subset model, keeping headers already set on `response`."""
+    adapter = subset_adapter(schema, fields)
+    return encoded_response(adapter.dump_json(adapter.validate_python([row._mapping for row in rows])), response)
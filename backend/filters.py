@@ -0,0 +1,78 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from . import models
+
+# List filters and sorting
+#
+# Each list endpoint accepts a whitelisted set of filter parameters and sort
+# keys. Filters become WHERE clauses that line up with the composite indexes
+# declared on the models, so `?farmer_id=3&status=Pending` is an index range
+# scan. `sort=date` / `sort=-date` picks the keyset order used by pagination;
+# the primary key is appended as a tiebreaker in the same direction.
+
+class InvalidQuery(ValueError):
+    pass
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+TASK_FILTERS = {
+    "farmer_id": lambda value: models.Task.farmer_id == value,
+    "status": lambda value: models.Task.status == value,
+}
+TASK_SORTS = {
+    "id": models.Task.id,
+}
+
+TRANSACTION_FILTERS = {
+    "item_id": lambda value: models.Transaction.item_id == value,
+    "type": lambda value: models.Transaction.type == value,
+    "date_from": lambda value: models.Transaction.date >= _day_start(value),
+    "date_to": lambda value: models.Transaction.date < _day_start(value + timedelta(days=1)),
+}
+TRANSACTION_SORTS = {
+    "id": models.Transaction.id,
+    "date": models.Transaction.date,
+}
+
+CROP_FILTERS = {
+    "land_id": lambda value: models.Crop.land_id == value,
+    "status": lambda value: models.Crop.status == value,
+    "planted_from": lambda value: models.Crop.planting_date >= _day_start(value),
+    "planted_to": lambda value: models.Crop.planting_date < _day_start(value + timedelta(days=1)),
+}
+CROP_SORTS = {
+    "id": models.Crop.id,
+    "planting_date": models.Crop.planting_date,
+    "expected_harvest_date": models.Crop.expected_harvest_date,
+}
+
+LAND_FILTERS = {
+    "farmer_id": lambda value: models.Land.farmer_id == value,
+}
+LAND_SORTS = {
+    "id": models.Land.id,
+    "name": models.Land.name,
+    "size": models.Land.size,
+}
+
+def apply_filters(query, spec: dict, filters: Optional[dict]):
+    """Add a WHERE clause for every filter in `filters` that has a value."""
+    for name, value in (filters or {}).items():
+        if value is None:
+            continue
+        if name not in spec:
+            raise InvalidQuery(f"Unknown filter '{name}', expected one of: {', '.join(spec)}")
+        query = query.filter(spec[name](value))
+    return query
+
+def sort_order(sorts: dict, sort: str, primary_key) -> list:
+    """Translate `name` / `-name` into the `(column, descending)` list used by pagination."""
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in sorts:
+        raise InvalidQuery(f"Unknown sort key '{key}', expected one of: {', '.join(sorts)}")
+    column = sorts[key]
+    if column is primary_key:
+        return [(primary_key, descending)]
+    return [(column, descending), (primary_key, descending)]
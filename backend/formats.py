@@ -0,0 +1,104 @@
+from datetime import date, datetime
+from typing import Optional
+from fastapi import HTTPException, Request, Response
+from .filters import InvalidQuery
+from .responses import dumps, encoded_response
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is in requirements.txt
+    msgpack = None
+
+# Columnar response formats
+#
+# Endpoints that analytics clients pull whole tables from can answer in a
+# columnar layout instead of a list of objects:
+#
+#     {"columns": ["id", "date", ...], "data": {"id": [1, 2, ...], "date": [...]}}
+#
+# either as JSON (Accept: application/vnd.farm.columnar+json or ?format=columnar)
+# or as MessagePack (Accept: application/x-msgpack or ?format=msgpack). Keys
+# appear once instead of once per row, and the columns are built straight from
+# the SQL result tuples without a dict or pydantic object per row.
+
+JSON = "json"
+COLUMNAR = "columnar"
+MSGPACK = "msgpack"
+FORMATS = (JSON, COLUMNAR, MSGPACK)
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.farm.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+MEDIA_TYPES = {
+    JSON: "application/json",
+    COLUMNAR: COLUMNAR_MEDIA_TYPE,
+    MSGPACK: MSGPACK_MEDIA_TYPE,
+}
+
+# Accept media ranges understood by each format
+_ACCEPTED = {
+    JSON: ("application/json", "application/*", "*/*"),
+    COLUMNAR: (COLUMNAR_MEDIA_TYPE,),
+    MSGPACK: (MSGPACK_MEDIA_TYPE, "application/msgpack"),
+}
+
+def _accept_weights(accept: str) -> dict:
+    weights = {}
+    for part in accept.split(","):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type:
+            weights[media_type.lower()] = q
+    return weights
+
+def negotiate(request: Request, response: Response, format: Optional[str] = None) -> str:
+    """Pick the response format from `?format=` or else the Accept header."""
+    response.headers["Vary"] = "Accept"
+    if format is not None:
+        if format not in FORMATS:
+            raise InvalidQuery(f"Unknown format '{format}', expected one of: {', '.join(FORMATS)}")
+        chosen = format
+    else:
+        accept = request.headers.get("accept")
+        if not accept:
+            return JSON
+        weights = _accept_weights(accept)
+        # On equal weights the earlier entry of FORMATS wins, so plain JSON is preferred
+        q, _, chosen = max(
+            (max((weights.get(media_type, 0.0) for media_type in _ACCEPTED[name]), default=0.0), -index, name)
+            for index, name in enumerate(FORMATS)
+        )
+        if q <= 0:
+            # Nothing acceptable: answer with plain JSON as before rather than 406
+            return JSON
+    if chosen == MSGPACK and msgpack is None:
+        raise HTTPException(status_code=406, detail="MessagePack responses need the msgpack package on the server")
+    return chosen
+
+def columnar(names, rows) -> dict:
+    """Transpose result tuples into one list per column; trailing extra columns are dropped."""
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return {
+        "columns": list(names),
+        "data": {name: list(values) for name, values in zip(names, columns)},
+    }
+
+def _msgpack_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} cannot be packed")
+
+def encode(fmt: str, document) -> bytes:
+    if fmt == MSGPACK:
+        return msgpack.packb(document, default=_msgpack_default, use_bin_type=True)
+    return dumps(document)
+
+def respond(fmt: str, document, response: Response) -> Response:
+    """Encode `document` in `fmt`, keeping headers already set on `response`."""
+    return encoded_response(encode(fmt, document), response, MEDIA_TYPES[fmt])
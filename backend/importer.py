@@ -0,0 +1,194 @@
+import argparse
+import csv
+import sys
+from collections import OrderedDict
+from sqlalchemy.orm import Session
+from . import crud, models
+
+# CSV import pipeline
+#
+# Streams a CSV file row by row through parse -> foreign key resolution ->
+# chunked bulk insert. Validation and the insert itself go through the
+# crud.bulk_create_* functions, so each chunk is validated in one pass and
+# committed once. Only one chunk is held in memory at a time; rejected rows are
+# reported with their error as they are found.
+#
+# Lands may name their farmer in a `farmer` column and crops their land in a
+# `land` column instead of giving the id.
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# Upper bound on cached name -> id lookups per import
+RESOLVER_CACHE_SIZE = 100_000
+
+# Names looked up per IN (...) query
+LOOKUP_CHUNK = 500
+
+class NameResolver:
+    """Resolve names to ids with a bounded cache and one query per chunk of misses."""
+
+    def __init__(self, db: Session, model, max_entries: int = RESOLVER_CACHE_SIZE):
+        self.db = db
+        self.model = model
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+
+    def resolve_many(self, names) -> dict:
+        missing = {name for name in names if name not in self._cache}
+        if missing:
+            found = {}
+            missing = list(missing)
+            for start in range(0, len(missing), LOOKUP_CHUNK):
+                chunk = missing[start:start + LOOKUP_CHUNK]
+                rows = self.db.query(self.model.name, self.model.id).filter(
+                    self.model.name.in_(chunk)
+                ).order_by(self.model.id.desc())
+                # Descending ids so the oldest row wins when names repeat
+                found.update({name: row_id for name, row_id in rows})
+            for name in missing:
+                self._remember(name, found.get(name))
+        resolved = {}
+        for name in names:
+            self._cache.move_to_end(name)
+            resolved[name] = self._cache[name]
+        return resolved
+
+    def _remember(self, name, row_id):
+        self._cache[name] = row_id
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+class _Resource:
+    def __init__(self, bulk_create, reference_column=None, reference_model=None, id_field=None):
+        self.bulk_create = bulk_create
+        self.reference_column = reference_column
+        self.reference_model = reference_model
+        self.id_field = id_field
+
+RESOURCES = {
+    "farmers": _Resource(crud.bulk_create_farmers),
+    "lands": _Resource(crud.bulk_create_lands, "farmer", models.Farmer, "farmer_id"),
+    "crops": _Resource(crud.bulk_create_crops, "land", models.Land, "land_id"),
+}
+
+def _clean(row: dict) -> dict:
+    """Drop empty cells so optional fields fall back to their defaults."""
+    return {key: value.strip() for key, value in row.items() if key and value is not None and value.strip() != ""}
+
+def _process_chunk(db: Session, resource: _Resource, resolver, chunk: list, on_reject):
+    """Insert one chunk of `(line_number, raw_row)` pairs; return `(imported, rejected)`."""
+    rows, pending = [], []
+    rejected = 0
+
+    names = set()
+    if resolver is not None:
+        names = {
+            row[resource.reference_column].strip()
+            for _, row in chunk
+            if (row.get(resource.reference_column) or "").strip()
+        }
+    resolved = resolver.resolve_many(names) if names else {}
+
+    for line_number, raw in chunk:
+        row = _clean(raw)
+        if resolver is not None and resource.reference_column in row:
+            name = row.pop(resource.reference_column)
+            row_id = resolved.get(name)
+            if row_id is None and resource.id_field not in row:
+                rejected += 1
+                if on_reject is not None:
+                    on_reject(line_number, raw, f"{resource.reference_model.__name__} '{name}' not found")
+                continue
+            row.setdefault(resource.id_field, row_id)
+        rows.append(row)
+        pending.append((line_number, raw))
+
+    result = resource.bulk_create(db, rows) if rows else {"ids": [], "errors": []}
+    for error in result["errors"]:
+        line_number, raw = pending[error["index"]]
+        rejected += 1
+        if on_reject is not None:
+            on_reject(line_number, raw, error["detail"])
+    return len(rows) - len(result["errors"]), rejected
+
+def import_csv(
+    db: Session,
+    resource_name: str,
+    stream,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_reject=None,
+    progress=None,
+) -> dict:
+    """Import rows from the text stream `stream` into `resource_name`.
+
+    `on_reject(line_number, row, error)` is called for every rejected row and
+    `progress(processed, imported, rejected)` after every chunk.
+    """
+    if resource_name not in RESOURCES:
+        raise ValueError(f"Unknown import resource '{resource_name}', expected one of: {', '.join(RESOURCES)}")
+    resource = RESOURCES[resource_name]
+    resolver = NameResolver(db, resource.reference_model) if resource.reference_model is not None else None
+
+    reader = csv.DictReader(stream)
+    processed = imported = rejected = 0
+    chunk = []
+
+    def flush():
+        nonlocal imported, rejected
+        chunk_imported, chunk_rejected = _process_chunk(db, resource, resolver, chunk, on_reject)
+        imported += chunk_imported
+        rejected += chunk_rejected
+        chunk.clear()
+        if progress is not None:
+            progress(processed, imported, rejected)
+
+    for row in reader:
+        processed += 1
+        chunk.append((reader.line_num, row))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    return {"processed": processed, "imported": imported, "rejected": rejected}
+
+def main(argv=None):
+    from .database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Import farmers, lands or crops from a CSV file")
+    parser.add_argument("resource", choices=list(RESOURCES))
+    parser.add_argument("path", help="CSV file with a header row")
+    parser.add_argument("--rejects", help="write rejected rows and their errors to this CSV file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    def report(processed, imported, rejected):
+        print(f"\r{processed} rows read, {imported} imported, {rejected} rejected", end="", file=sys.stderr, flush=True)
+
+    rejects_file = open(args.rejects, "w", newline="", encoding="utf-8") if args.rejects else None
+    rejects = None
+
+    def reject(line_number, row, error):
+        nonlocal rejects
+        if rejects_file is None:
+            return
+        if rejects is None:
+            rejects = csv.DictWriter(rejects_file, fieldnames=list(row) + ["line", "error"], extrasaction="ignore")
+            rejects.writeheader()
+        rejects.writerow({**row, "line": line_number, "error": error})
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        with open(args.path, newline="", encoding="utf-8-sig") as stream:
+            summary = import_csv(db, args.resource, stream, args.chunk_size, reject, report)
+        print(file=sys.stderr)
+        print(f"Imported {summary['imported']} of {summary['processed']} rows, {summary['rejected']} rejected")
+        return 0 if summary["rejected"] == 0 else 1
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
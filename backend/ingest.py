@@ -0,0 +1,117 @@
+import asyncio
+import os
+from . import crud
+from .database import AsyncSessionLocal, run_write
+
+# Batched transaction ingestion
+#
+# Opt-in with TRANSACTION_BATCHING=1. POST /items/transactions/ then queues
+# the transaction instead of committing it on its own. One writer task takes
+# whatever is queued, up to TRANSACTION_BATCH_SIZE transactions or whatever
+# arrives within TRANSACTION_BATCH_WAIT_MS of the first one, and records the
+# batch with one commit: one INSERT for the rows, one stock UPDATE per item
+# and one rollup update. Each request waits until the commit of its batch
+# and then gets its own row back, or its own 409 for a sale the stock could
+# not cover at its place in the queue.
+#
+# The queue lives in the API process. With several workers each has its own
+# queue and writer; their batches still apply stock changes safely, see
+# crud.create_transactions_batch.
+
+ENABLED = os.getenv("TRANSACTION_BATCHING", "0").lower() in ("1", "true", "yes")
+BATCH_SIZE = int(os.getenv("TRANSACTION_BATCH_SIZE", "256"))
+BATCH_WAIT_MS = float(os.getenv("TRANSACTION_BATCH_WAIT_MS", "2"))
+
+class TransactionBatcher:
+    def __init__(self, batch_size: int = BATCH_SIZE, wait_ms: float = BATCH_WAIT_MS):
+        self.batch_size = batch_size
+        self.wait = wait_ms / 1000
+        self._queue = None
+        self._writer = None
+        self.batches = 0
+        self.transactions = 0
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None and not self._writer.done()
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "transactions": self.transactions,
+            "average_batch": round(self.transactions / self.batches, 1) if self.batches else 0,
+        }
+
+    async def start(self):
+        # Bounded, so a writer that falls behind slows the callers down instead of queueing without limit
+        self._queue = asyncio.Queue(maxsize=self.batch_size * 8)
+        self._writer = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Let the writer finish what is queued, then stop it."""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._writer.cancel()
+        try:
+            await self._writer
+        except asyncio.CancelledError:
+            pass
+        self._writer = None
+
+    async def submit(self, transaction):
+        """Queue `transaction` and wait until its batch is committed; returns the recorded row."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((transaction, future))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, batch: list):
+        # Callers that went away no longer need their rows, but their transactions are still recorded
+        transactions = [transaction for transaction, _ in batch]
+        try:
+            async with AsyncSessionLocal() as db:
+                results = await run_write(db, crud.create_transactions_batch, transactions)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.transactions += len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+batcher = TransactionBatcher()
@@ -1,29 +1,38 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import farmers, tasks, items, assets, reports, lands, crops, auth, users
-from .database import engine, Base, SessionLocal
-from . import models, auth as auth_logic
-
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Farm Management API")
-
-# Create initial admin user
-def create_initial_admin():
-    db = SessionLocal()
-    try:
-        user = db.query(models.User).filter(models.User.username == "admin").first()
-        if not user:
-            hashed_password = auth_logic.get_password_hash("admin123")
-            admin_user = models.User(username="admin", hashed_password=hashed_password, role="admin")
-            db.add(admin_user)
-            db.commit()
-            print("Created initial admin user")
-    finally:
-        db.close()
-
-create_initial_admin()
+from .routers import farmers, tasks, items, assets, reports, lands, crops, auth, users, export, imports, views
+from .database import async_engine, async_read_engine
+from . import admission, ingest, startup, auth as auth_logic
+from .crud import InsufficientStock
+from .occupancy import CropConflict, InvalidPlanting
+from .filters import InvalidQuery
+from .pagination import InvalidCursor, NEXT_CURSOR_HEADER
+from .conditional import NotModified, not_modified_response
+from .compression import CompressionMiddleware
+from .admission import AdmissionMiddleware
+from .responses import DEFAULT_RESPONSE_CLASS
+
+# Tables and the initial admin user are created when the server starts, once
+# per worker and serialized across workers; see startup.py
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup.initialize()
+    if ingest.ENABLED:
+        await ingest.batcher.start()
+    yield
+    await ingest.batcher.stop()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+app = FastAPI(title="Farm Management API", default_response_class=DEFAULT_RESPONSE_CLASS, lifespan=lifespan)
+
+# Compress JSON, CSV and NDJSON bodies of 1 KB and more for clients that accept it
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Per-group concurrency limits with 503 load shedding; inside CORS so rejections carry its headers
+app.add_middleware(AdmissionMiddleware)
 
 # CORS
 origins = [
@@ -37,8 +46,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
 )
 
+@app.exception_handler(InvalidCursor)
+@app.exception_handler(InvalidQuery)
+@app.exception_handler(InvalidPlanting)
+def invalid_query_handler(request: Request, exc: ValueError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(InsufficientStock)
+@app.exception_handler(CropConflict)
+def conflict_handler(request: Request, exc: ValueError):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+@app.exception_handler(auth_logic.PasswordHasherBusy)
+def password_hasher_busy_handler(request: Request, exc: auth_logic.PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many password checks in progress, try again shortly"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(NotModified)
+def not_modified_handler(request: Request, exc: NotModified):
+    return not_modified_response(exc.etag)
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(users.router)
@@ -49,7 +82,15 @@ app.include_router(assets.router)
 app.include_router(reports.router)
 app.include_router(lands.router)
 app.include_router(crops.router)
+app.include_router(export.router)
+app.include_router(imports.router)
+app.include_router(views.router)
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to Farm Management API"}
+
+@app.get("/admission")
+def read_admission():
+    """Concurrency and queue-depth gauges of the admission control groups"""
+    return admission.stats()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Date, Boolean, Index, Text
 from sqlalchemy.orm import relationship
 from .database import Base
 import datetime
@@ -22,6 +22,10 @@ class Task(Base):
     
     farmer = relationship("Farmer", back_populates="tasks")
 
+    __table_args__ = (
+        Index("ix_tasks_farmer_id_status", "farmer_id", "status"),
+    )
+
 class Item(Base):
     __tablename__ = "items"
     id = Column(Integer, primary_key=True, index=True)
@@ -43,6 +47,11 @@ class Transaction(Base):
     
     item = relationship("Item")
 
+    __table_args__ = (
+        Index("ix_transactions_item_id_type_date", "item_id", "type", "date"),
+        Index("ix_transactions_date", "date"),
+    )
+
 class Asset(Base):
     __tablename__ = "assets"
     id = Column(Integer, primary_key=True, index=True)
@@ -64,6 +73,10 @@ class Land(Base):
     farmer = relationship("Farmer", back_populates="lands")
     crops = relationship("Crop", back_populates="land")
 
+    __table_args__ = (
+        Index("ix_lands_farmer_id", "farmer_id"),
+    )
+
 class Crop(Base):
     __tablename__ = "crops"
     id = Column(Integer, primary_key=True, index=True)
@@ -80,6 +93,10 @@ class Crop(Base):
     
     land = relationship("Land", back_populates="crops")
 
+    __table_args__ = (
+        Index("ix_crops_land_id_planting_date", "land_id", "planting_date"),
+    )
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -87,3 +104,69 @@ class User(Base):
     hashed_password = Column(String)
     role = Column(String, default="farmer") # admin, manager, farmer
     is_active = Column(Boolean, default=True)
+
+class ReportRollup(Base):
+    __tablename__ = "report_rollup"
+    id = Column(Integer, primary_key=True)
+    farmers = Column(Integer, default=0)
+    tasks = Column(Integer, default=0)
+    pending_tasks = Column(Integer, default=0)
+    completed_tasks = Column(Integer, default=0)
+    items = Column(Integer, default=0)
+    inventory_value = Column(Float, default=0.0)
+    transactions = Column(Integer, default=0)
+    purchases = Column(Integer, default=0)
+    sales = Column(Integer, default=0)
+    purchase_amount = Column(Float, default=0.0)
+    sales_amount = Column(Float, default=0.0)
+    assets = Column(Integer, default=0)
+    asset_value = Column(Float, default=0.0)
+
+class TransactionDaily(Base):
+    __tablename__ = "transaction_daily"
+    day = Column(Date, primary_key=True)
+    item_id = Column(Integer, primary_key=True)
+    type = Column(String, primary_key=True) # buy, sell
+    transaction_count = Column(Integer, default=0)
+    quantity = Column(Integer, default=0)
+    total_amount = Column(Float, default=0.0)
+
+    __table_args__ = (
+        Index("ix_transaction_daily_item_day", "item_id", "day"),
+    )
+
+class ItemStockSnapshot(Base):
+    __tablename__ = "item_stock_snapshots"
+    item_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True) # stock at the end of this day (UTC)
+    quantity = Column(Integer, default=0)
+    price = Column(Float, default=0.0)
+    value = Column(Float, default=0.0)
+
+    __table_args__ = (
+        Index("ix_item_stock_snapshots_day", "day"),
+    )
+
+class CostBasisCheckpoint(Base):
+    __tablename__ = "cost_basis_checkpoints"
+    item_id = Column(Integer, primary_key=True)
+    last_transaction_id = Column(Integer)
+    last_date = Column(DateTime)
+    fifo_lots = Column(Text, default="[]") # JSON list of [quantity, unit_cost]
+    average_quantity = Column(Float, default=0.0)
+    average_unit_cost = Column(Float, default=0.0)
+    sold_quantity = Column(Float, default=0.0)
+    unmatched_quantity = Column(Float, default=0.0) # sold without a recorded purchase
+    revenue = Column(Float, default=0.0)
+    fifo_cogs = Column(Float, default=0.0)
+    average_cogs = Column(Float, default=0.0)
+
+class CostBasisState(Base):
+    __tablename__ = "cost_basis_state"
+    id = Column(Integer, primary_key=True)
+    last_transaction_id = Column(Integer)  # every transaction up to this id is in the checkpoints
+
+class TableGeneration(Base):
+    __tablename__ = "table_generations"
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, default=0)  # bumped in the same transaction as every write to the table
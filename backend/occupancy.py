@@ -0,0 +1,119 @@
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+from sqlalchemy import bindparam, func, or_, select
+from sqlalchemy.orm import Session
+from . import models
+
+# Land occupancy
+#
+# A crop occupies its land from planting_date up to expected_harvest_date,
+# the half-open interval [planting, harvest). Plantings on one land may not
+# overlap, and create/update of a crop is refused with CropConflict when they
+# would. Because of that rule, the plantings of a land sorted by planting date
+# are also sorted by harvest date. The (land_id, planting_date) index is then
+# an interval index: only the last planting that starts before the end of a
+# range can reach into it, and one index seek finds that planting. Checking a
+# land costs O(log n) in the number of its plantings, however long its
+# history is.
+#
+# The ordering only holds if every planting ends after it starts, so a crop
+# whose expected harvest is not after its planting date is refused with
+# InvalidPlanting before any overlap check.
+#
+# Plantings recorded before the rule existed may overlap. Conflicts are still
+# found for new plantings, but an older planting that is hidden entirely
+# inside a longer one can be missed until the data is cleaned up.
+
+class CropConflict(ValueError):
+    """A planting overlaps other plantings on the same land."""
+    def __init__(self, land_id: int, crop_ids: List[int]):
+        super().__init__(
+            f"Land {land_id} is already planted in that period (crops {', '.join(map(str, crop_ids))})"
+        )
+        self.land_id = land_id
+        self.crop_ids = crop_ids
+
+class InvalidPlanting(ValueError):
+    """A planting whose expected harvest is not after its planting date."""
+    def __init__(self, start: datetime, end: datetime):
+        super().__init__(
+            f"expected_harvest_date ({end.isoformat()}) must be after planting_date ({start.isoformat()})"
+        )
+
+def naive_utc(at: datetime) -> datetime:
+    """`at` as the naive UTC datetime crop dates are stored as."""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+def require_interval(start: datetime, end: datetime):
+    """Raise InvalidPlanting unless `end` is after `start`."""
+    if naive_utc(end) <= naive_utc(start):
+        raise InvalidPlanting(start, end)
+
+def _overlapping_statement():
+    crops = models.Crop.__table__
+    on_land = (crops.c.land_id == bindparam("land_id"), crops.c.id.notin_(bindparam("exclude", expanding=True)))
+    # The last planting that starts at or before `start` is the only one from
+    # before the range that can still be on the land; later ones start inside it
+    anchor = select(func.max(crops.c.planting_date)).where(*on_land, crops.c.planting_date <= bindparam("start"))
+    return (
+        select(crops.c.id)
+        .where(
+            *on_land,
+            crops.c.planting_date < bindparam("end"),
+            crops.c.planting_date >= func.coalesce(anchor.scalar_subquery(), bindparam("start")),
+            or_(crops.c.expected_harvest_date > bindparam("start"), crops.c.planting_date >= bindparam("start")),
+        )
+        .order_by(crops.c.planting_date)
+    )
+
+# Built once; checks run on every crop write
+_OVERLAPPING = _overlapping_statement()
+
+def overlapping(db: Session, land_id: int, start: datetime, end: datetime, exclude: Iterable[int] = ()) -> List[int]:
+    """Ids of the crops on `land_id` whose planting overlaps [start, end)."""
+    params = {"land_id": land_id, "start": start, "end": end, "exclude": list(exclude)}
+    return list(db.scalars(_OVERLAPPING, params))
+
+def check(db: Session, land_id: int, start: datetime, end: datetime, exclude: Iterable[int] = ()):
+    """Raise CropConflict when [start, end) overlaps a planting on `land_id`, InvalidPlanting if it is empty."""
+    if start is not None and end is not None:
+        require_interval(start, end)
+    if land_id is None or start is None or end is None:
+        return
+    conflicts = overlapping(db, land_id, start, end, exclude)
+    if conflicts:
+        raise CropConflict(land_id, conflicts)
+
+def free_lands(db: Session, start: datetime, end: datetime, min_size: Optional[float] = None):
+    """Lands with no planting overlapping [start, end), at least `min_size` large."""
+    crop, land = models.Crop, models.Land
+    # Harvest date of the last planting that starts before `end`: one index seek per land
+    last_harvest = (
+        db.query(crop.expected_harvest_date)
+        .filter(crop.land_id == land.id, crop.planting_date < end)
+        .order_by(crop.planting_date.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    query = db.query(land).filter(func.coalesce(last_harvest, start) <= start)
+    if min_size is not None:
+        query = query.filter(land.size >= min_size)
+    return query.order_by(land.id).all()
+
+class PlantingIndex:
+    """Plantings per land kept sorted by start, for checking a batch before it is written."""
+
+    def __init__(self):
+        self._lands = {}
+
+    def overlapping(self, land_id: int, start: datetime, end: datetime) -> bool:
+        plantings = self._lands.get(land_id, [])
+        position = bisect_left(plantings, (end,))
+        return position > 0 and (plantings[position - 1][1] > start or plantings[position - 1][0] >= start)
+
+    def add(self, land_id: int, start: datetime, end: datetime):
+        plantings = self._lands.setdefault(land_id, [])
+        plantings.insert(bisect_left(plantings, (start, end)), (start, end))
@@ -0,0 +1,321 @@
+import datetime
+from sqlalchemy import case, func, true
+from sqlalchemy.orm import Session
+from . import models
+
+# Report engine
+#
+# Every report is computed by a single SELECT built from GROUP BY /
+# conditional-aggregate subqueries, so the number of statements does not grow
+# with the number of farmers or items and each report is read from one
+# consistent snapshot.
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+def _sum_if(condition, column):
+    return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+def _order_by(query, sort: str, sort_keys: dict, tiebreaker):
+    """Apply a `name` / `-name` sort from the whitelist plus a stable tiebreaker."""
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in sort_keys:
+        raise ValueError(f"Unknown sort key '{key}', expected one of: {', '.join(sort_keys)}")
+    column = sort_keys[key]
+    return query.order_by(column.desc() if descending else column.asc(), tiebreaker)
+
+def _paginate(query, skip: int = 0, limit: int = None):
+    if skip:
+        query = query.offset(skip)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+# Summary
+def summary_totals_query(db: Session):
+    """All summary counters in one row; each table is scanned once."""
+    farmers = db.query(
+        func.count(models.Farmer.id).label("farmers"),
+    ).subquery()
+    tasks = db.query(
+        func.count(models.Task.id).label("tasks"),
+        _count_if(models.Task.status == "Pending").label("pending_tasks"),
+        _count_if(models.Task.status == "Completed").label("completed_tasks"),
+    ).subquery()
+    items = db.query(
+        func.count(models.Item.id).label("items"),
+        func.coalesce(func.sum(models.Item.quantity * models.Item.price), 0).label("inventory_value"),
+    ).subquery()
+    transactions = db.query(
+        func.count(models.Transaction.id).label("transactions"),
+        _count_if(models.Transaction.type == "buy").label("purchases"),
+        _count_if(models.Transaction.type == "sell").label("sales"),
+        _sum_if(models.Transaction.type == "buy", models.Transaction.total_price).label("purchase_amount"),
+        _sum_if(models.Transaction.type == "sell", models.Transaction.total_price).label("sales_amount"),
+    ).subquery()
+    assets = db.query(
+        func.count(models.Asset.id).label("assets"),
+        func.coalesce(func.sum(models.Asset.value), 0).label("asset_value"),
+    ).subquery()
+
+    return (
+        db.query(farmers, tasks, items, transactions, assets)
+        .select_from(farmers)
+        .join(tasks, true())
+        .join(items, true())
+        .join(transactions, true())
+        .join(assets, true())
+    )
+
+def format_summary(totals) -> dict:
+    """Shape a row of summary counters into the /reports/summary payload."""
+    return {
+        "farmers": {
+            "total": totals.farmers
+        },
+        "tasks": {
+            "total": totals.tasks,
+            "pending": totals.pending_tasks,
+            "completed": totals.completed_tasks,
+            "in_progress": totals.tasks - totals.pending_tasks - totals.completed_tasks
+        },
+        "items": {
+            "total": totals.items,
+            "inventory_value": round(totals.inventory_value, 2)
+        },
+        "transactions": {
+            "total": totals.transactions,
+            "purchases": totals.purchases,
+            "sales": totals.sales,
+            "total_purchase_amount": round(totals.purchase_amount, 2),
+            "total_sales_amount": round(totals.sales_amount, 2),
+            "net_profit": round(totals.sales_amount - totals.purchase_amount, 2)
+        },
+        "assets": {
+            "total": totals.assets,
+            "total_value": round(totals.asset_value, 2)
+        }
+    }
+
+def summary_report(db: Session) -> dict:
+    return format_summary(summary_totals_query(db).one())
+
+# Farmer report
+def farmer_report_query(db: Session, sort: str = "id"):
+    task_stats = db.query(
+        models.Task.farmer_id.label("farmer_id"),
+        func.count(models.Task.id).label("total_tasks"),
+        _count_if(models.Task.status == "Completed").label("completed_tasks"),
+    ).group_by(models.Task.farmer_id).subquery()
+
+    total_tasks = func.coalesce(task_stats.c.total_tasks, 0)
+    completed_tasks = func.coalesce(task_stats.c.completed_tasks, 0)
+    sort_keys = {
+        "id": models.Farmer.id,
+        "name": models.Farmer.name,
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "pending_tasks": total_tasks - completed_tasks,
+    }
+
+    query = db.query(
+        models.Farmer.id,
+        models.Farmer.name,
+        models.Farmer.phone,
+        models.Farmer.address,
+        total_tasks.label("total_tasks"),
+        completed_tasks.label("completed_tasks"),
+    ).outerjoin(task_stats, task_stats.c.farmer_id == models.Farmer.id)
+    return _order_by(query, sort, sort_keys, models.Farmer.id)
+
+def format_farmer_row(row) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "phone": row.phone,
+        "address": row.address,
+        "total_tasks": row.total_tasks,
+        "completed_tasks": row.completed_tasks,
+        "pending_tasks": row.total_tasks - row.completed_tasks
+    }
+
+def farmer_report(db: Session, skip: int = 0, limit: int = None, sort: str = "id"):
+    query = _paginate(farmer_report_query(db, sort), skip, limit)
+    return [format_farmer_row(row) for row in query.all()]
+
+# Item report
+def item_report_query(db: Session, sort: str = "id"):
+    is_buy = models.Transaction.type == "buy"
+    is_sell = models.Transaction.type == "sell"
+    transaction_stats = db.query(
+        models.Transaction.item_id.label("item_id"),
+        _count_if(is_buy).label("buy_transactions"),
+        _count_if(is_sell).label("sell_transactions"),
+        _sum_if(is_buy, models.Transaction.quantity).label("total_bought"),
+        _sum_if(is_sell, models.Transaction.quantity).label("total_sold"),
+    ).group_by(models.Transaction.item_id).subquery()
+
+    buy_transactions = func.coalesce(transaction_stats.c.buy_transactions, 0)
+    sell_transactions = func.coalesce(transaction_stats.c.sell_transactions, 0)
+    total_bought = func.coalesce(transaction_stats.c.total_bought, 0)
+    total_sold = func.coalesce(transaction_stats.c.total_sold, 0)
+    sort_keys = {
+        "id": models.Item.id,
+        "name": models.Item.name,
+        "type": models.Item.type,
+        "current_quantity": models.Item.quantity,
+        "price_per_unit": models.Item.price,
+        "inventory_value": models.Item.quantity * models.Item.price,
+        "total_bought": total_bought,
+        "total_sold": total_sold,
+        "buy_transactions": buy_transactions,
+        "sell_transactions": sell_transactions,
+    }
+
+    query = db.query(
+        models.Item.id,
+        models.Item.name,
+        models.Item.type,
+        models.Item.quantity,
+        models.Item.price,
+        total_bought.label("total_bought"),
+        total_sold.label("total_sold"),
+        buy_transactions.label("buy_transactions"),
+        sell_transactions.label("sell_transactions"),
+    ).outerjoin(transaction_stats, transaction_stats.c.item_id == models.Item.id)
+    return _order_by(query, sort, sort_keys, models.Item.id)
+
+def format_item_row(row) -> dict:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "type": row.type,
+        "current_quantity": row.quantity,
+        "price_per_unit": row.price,
+        "inventory_value": round(row.quantity * row.price, 2),
+        "total_bought": row.total_bought,
+        "total_sold": row.total_sold,
+        "buy_transactions": row.buy_transactions,
+        "sell_transactions": row.sell_transactions
+    }
+
+def item_report(db: Session, skip: int = 0, limit: int = None, sort: str = "id"):
+    query = _paginate(item_report_query(db, sort), skip, limit)
+    return [format_item_row(row) for row in query.all()]
+
+ITEM_REPORT_COLUMNS = (
+    "id", "name", "type", "current_quantity", "price_per_unit", "inventory_value",
+    "total_bought", "total_sold", "buy_transactions", "sell_transactions",
+)
+
+def item_report_columns(db: Session, skip: int = 0, limit: int = None, sort: str = "id") -> dict:
+    """The item report as one list per column, transposed from the result tuples."""
+    rows = _paginate(item_report_query(db, sort), skip, limit).all()
+    ids, names, types, quantities, prices, bought, sold, buys, sells = zip(*rows) if rows else ((),) * 9
+    columns = (
+        ids, names, types, quantities, prices,
+        [round(quantity * price, 2) for quantity, price in zip(quantities, prices)],
+        bought, sold, buys, sells,
+    )
+    return {
+        "columns": list(ITEM_REPORT_COLUMNS),
+        "data": {name: list(values) for name, values in zip(ITEM_REPORT_COLUMNS, columns)},
+    }
+
+# Transaction summary
+def transaction_summary(db: Session) -> dict:
+    is_buy = models.Transaction.type == "buy"
+    is_sell = models.Transaction.type == "sell"
+    totals = db.query(
+        _count_if(is_buy).label("buy_count"),
+        _sum_if(is_buy, models.Transaction.quantity).label("buy_quantity"),
+        _sum_if(is_buy, models.Transaction.total_price).label("buy_amount"),
+        _count_if(is_sell).label("sell_count"),
+        _sum_if(is_sell, models.Transaction.quantity).label("sell_quantity"),
+        _sum_if(is_sell, models.Transaction.total_price).label("sell_amount"),
+    ).one()
+
+    return {
+        "buy": {
+            "transaction_count": totals.buy_count,
+            "total_quantity": totals.buy_quantity,
+            "total_amount": round(totals.buy_amount, 2)
+        },
+        "sell": {
+            "transaction_count": totals.sell_count,
+            "total_quantity": totals.sell_quantity,
+            "total_amount": round(totals.sell_amount, 2)
+        },
+        "profit": round(totals.sell_amount - totals.buy_amount, 2)
+    }
+
+# Transaction time series
+#
+# Read from the daily rollup, so a year of data is at most 365 rows per item
+# and type regardless of how many transactions were recorded.
+
+BUCKETS = ("day", "week", "month", "year")
+
+def _bucket_expression(bucket: str, day):
+    if bucket == "day":
+        return func.date(day)
+    if bucket == "week":
+        # Monday of the ISO week containing `day`
+        return func.date(day, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", day)
+    if bucket == "year":
+        return func.strftime("%Y-01-01", day)
+    raise ValueError(f"Unknown bucket '{bucket}', expected one of: {', '.join(BUCKETS)}")
+
+def transaction_timeseries(
+    db: Session,
+    bucket: str = "day",
+    date_from: datetime.date = None,
+    date_to: datetime.date = None,
+    item_id: int = None,
+    type: str = None,
+):
+    """Buy/sell totals per period between `date_from` and `date_to` (inclusive)."""
+    daily = models.TransactionDaily
+    period = _bucket_expression(bucket, daily.day).label("period")
+    is_buy = daily.type == "buy"
+    is_sell = daily.type == "sell"
+
+    query = db.query(
+        period,
+        _sum_if(is_buy, daily.transaction_count).label("buy_count"),
+        _sum_if(is_buy, daily.quantity).label("buy_quantity"),
+        _sum_if(is_buy, daily.total_amount).label("buy_amount"),
+        _sum_if(is_sell, daily.transaction_count).label("sell_count"),
+        _sum_if(is_sell, daily.quantity).label("sell_quantity"),
+        _sum_if(is_sell, daily.total_amount).label("sell_amount"),
+    )
+    if date_from is not None:
+        query = query.filter(daily.day >= date_from)
+    if date_to is not None:
+        query = query.filter(daily.day <= date_to)
+    if item_id is not None:
+        query = query.filter(daily.item_id == item_id)
+    if type is not None:
+        query = query.filter(daily.type == type)
+    query = query.group_by(period).order_by(period)
+
+    return [
+        {
+            "period": row.period,
+            "buy": {
+                "transaction_count": row.buy_count,
+                "total_quantity": row.buy_quantity,
+                "total_amount": round(row.buy_amount, 2)
+            },
+            "sell": {
+                "transaction_count": row.sell_count,
+                "total_quantity": row.sell_quantity,
+                "total_amount": round(row.sell_amount, 2)
+            },
+            "profit": round(row.sell_amount - row.buy_amount, 2)
+        }
+        for row in query.all()
+    ]
@@ -0,0 +1,51 @@
+import inspect
+import json
+from typing import Any
+from fastapi import Response
+from fastapi.datastructures import Default
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+# Fast JSON responses
+#
+# Routes that return plain dicts (the reports) are encoded with orjson and
+# handed to the client as ready-made bytes, skipping FastAPI's
+# jsonable_encoder walk over every value. The output matches what FastAPI
+# produced before: datetimes in ISO 8601 without a timezone, floats in
+# shortest repr form. Without orjson the stdlib encoder is used.
+
+def _default(value):
+    # Types orjson does not know natively (Decimal, pydantic models, ...)
+    return jsonable_encoder(value)
+
+if orjson is not None:
+    def dumps(content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content: Any) -> bytes:
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def encoded_response(body: bytes, response: Response = None, media_type: str = "application/json") -> Response:
+    """A response for an already encoded body, keeping headers set on `response`."""
+    headers = None
+    if response is not None:
+        headers = {key: value for key, value in response.headers.items() if key != "content-length"}
+    return Response(content=body, media_type=media_type, headers=headers)
+
+# Newer FastAPI versions serialize response_model routes straight to bytes
+# with pydantic's dump_json, but only while the default response class is
+# left alone. Replace it application-wide only where that fast path is missing.
+NATIVE_FAST_PATH = "dump_json" in inspect.signature(serialize_response).parameters
+DEFAULT_RESPONSE_CLASS = Default(JSONResponse) if NATIVE_FAST_PATH else FastJSONResponse
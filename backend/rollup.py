@@ -0,0 +1,264 @@
+import argparse
+import sys
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from . import models, reporting
+from .cache import table_generations
+
+# Summary rollup
+#
+# A single `report_rollup` row holds the counters behind /reports/summary.
+# The crud write paths apply deltas to it inside their own transaction, so the
+# summary endpoint reads one row instead of aggregating every table.
+#
+# Daily transaction rollup
+#
+# `transaction_daily` keeps one row per (day, item, type) with the count,
+# quantity and amount of that day's transactions. It is upserted as
+# transactions are inserted and backs the time-series report. A database that
+# already has transactions when the table appears is backfilled from the
+# ledger at startup, see ensure_daily().
+
+ROLLUP_ID = 1
+
+COUNTERS = (
+    "farmers",
+    "tasks",
+    "pending_tasks",
+    "completed_tasks",
+    "items",
+    "inventory_value",
+    "transactions",
+    "purchases",
+    "sales",
+    "purchase_amount",
+    "sales_amount",
+    "assets",
+    "asset_value",
+)
+
+# Floating point deltas accumulate rounding error; anything below this is not
+# treated as drift by verify().
+TOLERANCE = 1e-6
+
+def task_deltas(status: str, sign: int = 1) -> dict:
+    """Counter deltas for adding (sign=1) or removing (sign=-1) a task with `status`."""
+    deltas = {"tasks": sign}
+    if status == "Pending":
+        deltas["pending_tasks"] = sign
+    elif status == "Completed":
+        deltas["completed_tasks"] = sign
+    return deltas
+
+def merge_deltas(*parts: dict) -> dict:
+    merged = {}
+    for part in parts:
+        for key, value in part.items():
+            merged[key] = merged.get(key, 0) + value
+    return merged
+
+def apply(db: Session, **deltas):
+    """Add `deltas` to the rollup row as part of the caller's transaction.
+
+    If the row does not exist yet it is built from the tables instead, which
+    already include the caller's flushed changes.
+    """
+    deltas = {key: value for key, value in deltas.items() if value}
+    if not deltas:
+        return
+    unknown = set(deltas) - set(COUNTERS)
+    if unknown:
+        raise ValueError(f"Unknown rollup counters: {', '.join(sorted(unknown))}")
+
+    db.flush()
+    values = {
+        key: getattr(models.ReportRollup, key) + value
+        for key, value in deltas.items()
+    }
+    result = db.execute(
+        update(models.ReportRollup)
+        .where(models.ReportRollup.id == ROLLUP_ID)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        rebuild(db)
+
+def compute(db: Session) -> dict:
+    """Recompute every counter from the underlying tables."""
+    totals = reporting.summary_totals_query(db).one()
+    return {key: getattr(totals, key) for key in COUNTERS}
+
+def rebuild(db: Session) -> models.ReportRollup:
+    """Overwrite the rollup row with freshly computed counters (caller commits)."""
+    db_rollup = db.get(models.ReportRollup, ROLLUP_ID)
+    if db_rollup is None:
+        db_rollup = models.ReportRollup(id=ROLLUP_ID)
+        db.add(db_rollup)
+    for key, value in compute(db).items():
+        setattr(db_rollup, key, value)
+    db.flush()
+    return db_rollup
+
+def read(db: Session) -> models.ReportRollup:
+    """Return the rollup row, building it on first use."""
+    db_rollup = db.get(models.ReportRollup, ROLLUP_ID)
+    if db_rollup is None:
+        if db.info.get("read_only"):
+            # Read-only sessions cannot store the row; compute the counters without it
+            return models.ReportRollup(id=ROLLUP_ID, **compute(db))
+        db_rollup = rebuild(db)
+        db.commit()
+    return db_rollup
+
+def verify(db: Session) -> dict:
+    """Compare the stored rollup with a fresh computation.
+
+    Returns `{counter: (stored, computed)}` for every counter that drifted.
+    """
+    db_rollup = db.get(models.ReportRollup, ROLLUP_ID)
+    computed = compute(db)
+    mismatches = {}
+    for key, expected in computed.items():
+        stored = getattr(db_rollup, key) if db_rollup is not None else None
+        if stored is None or abs(stored - expected) > TOLERANCE:
+            mismatches[key] = (stored, expected)
+    return mismatches
+
+# Daily transaction rollup
+def daily_deltas(records) -> dict:
+    """Aggregate transaction column dicts into `{(day, item_id, type): [count, quantity, amount]}`."""
+    deltas = {}
+    for record in records:
+        key = (record["date"].date(), record["item_id"], record["type"])
+        totals = deltas.setdefault(key, [0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += record["quantity"] or 0
+        totals[2] += record["total_price"] or 0
+    return deltas
+
+def apply_daily(db: Session, deltas: dict):
+    """Add `daily_deltas()` output to the daily rollup: one UPDATE for existing groups, one INSERT for new ones."""
+    if not deltas:
+        return
+    daily = models.TransactionDaily
+    days = {day for day, _, _ in deltas}
+    existing = set(db.execute(select(daily.day, daily.item_id, daily.type).where(daily.day.in_(days))).tuples())
+    rows = [
+        {"day": day, "item_id": item_id, "type": type_, "transaction_count": count, "quantity": quantity, "total_amount": amount}
+        for (day, item_id, type_), (count, quantity, amount) in deltas.items()
+    ]
+    updates = [row for row in rows if (row["day"], row["item_id"], row["type"]) in existing]
+    if updates:
+        table = daily.__table__
+        db.execute(
+            update(table)
+            .where(table.c.day == bindparam("b_day"), table.c.item_id == bindparam("b_item_id"), table.c.type == bindparam("b_type"))
+            .values(
+                transaction_count=table.c.transaction_count + bindparam("b_count"),
+                quantity=table.c.quantity + bindparam("b_quantity"),
+                total_amount=table.c.total_amount + bindparam("b_amount"),
+            ),
+            [
+                {"b_day": row["day"], "b_item_id": row["item_id"], "b_type": row["type"],
+                 "b_count": row["transaction_count"], "b_quantity": row["quantity"], "b_amount": row["total_amount"]}
+                for row in updates
+            ],
+        )
+    inserts = [row for row in rows if (row["day"], row["item_id"], row["type"]) not in existing]
+    if inserts:
+        db.execute(insert(daily), inserts)
+
+def _daily_from_ledger():
+    return select(
+        func.date(models.Transaction.date).label("day"),
+        models.Transaction.item_id,
+        models.Transaction.type,
+        func.count(models.Transaction.id).label("transaction_count"),
+        func.coalesce(func.sum(models.Transaction.quantity), 0).label("quantity"),
+        func.coalesce(func.sum(models.Transaction.total_price), 0).label("total_amount"),
+    ).group_by(
+        func.date(models.Transaction.date),
+        models.Transaction.item_id,
+        models.Transaction.type,
+    )
+
+def rebuild_daily(db: Session):
+    """Recompute the daily rollup from the transaction ledger (caller commits)."""
+    daily = models.TransactionDaily
+    db.execute(delete(daily))
+    db.execute(insert(daily).from_select(
+        ["day", "item_id", "type", "transaction_count", "quantity", "total_amount"],
+        _daily_from_ledger(),
+    ))
+
+def daily_missing(db: Session) -> bool:
+    """True when the daily rollup is empty although the ledger is not."""
+    return (
+        db.query(models.Transaction.id).first() is not None
+        and db.query(models.TransactionDaily.day).first() is None
+    )
+
+def ensure_daily(db: Session) -> bool:
+    """Build the daily rollup from the ledger if it is missing; returns True when it was built."""
+    if not daily_missing(db):
+        return False
+    rebuild_daily(db)
+    table_generations.bump(db, "transaction_daily")
+    db.commit()
+    return True
+
+def verify_daily(db: Session) -> int:
+    """Return the number of (day, item, type) groups that disagree with the ledger."""
+    daily = models.TransactionDaily
+    stored = {
+        (row.day.isoformat(), row.item_id, row.type): row
+        for row in db.query(daily).all()
+    }
+    mismatches = 0
+    for row in db.execute(_daily_from_ledger()):
+        db_daily = stored.pop((row.day, row.item_id, row.type), None)
+        if (
+            db_daily is None
+            or db_daily.transaction_count != row.transaction_count
+            or db_daily.quantity != row.quantity
+            or abs(db_daily.total_amount - row.total_amount) > TOLERANCE
+        ):
+            mismatches += 1
+    return mismatches + len(stored)
+
+def main(argv=None):
+    from .database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Rebuild or verify the report rollups")
+    parser.add_argument("command", choices=["rebuild", "verify"])
+    args = parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rebuild(db)
+            rebuild_daily(db)
+            # Cached reports and ETags built on the old rollups go stale with this commit
+            table_generations.bump(db, "report_rollup", "transaction_daily")
+            db.commit()
+            print("Rollup rebuilt")
+            return 0
+
+        mismatches = verify(db)
+        for key, (stored, expected) in mismatches.items():
+            print(f"{key}: stored={stored} computed={expected}")
+        daily_mismatches = verify_daily(db)
+        if daily_mismatches:
+            print(f"transaction_daily: {daily_mismatches} day/item/type groups differ from the ledger")
+        if mismatches or daily_mismatches:
+            print("Rollup is out of date; run `python -m backend.rollup rebuild`")
+            return 1
+        print("Rollup is consistent")
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
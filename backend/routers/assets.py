@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from .. import crud, models, schemas
-from ..database import SessionLocal
+from ..pagination import MAX_LIMIT, set_next_cursor
+from ..conditional import etag
+from ..database import get_async_db, get_async_read_db
 
 router = APIRouter(
     prefix="/assets",
@@ -10,25 +12,18 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.Asset)
-def create_asset(asset: schemas.AssetCreate, db: Session = Depends(get_db)):
-    return crud.create_asset(db=db, asset=asset)
+async def create_asset(asset: schemas.AssetCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_asset, asset=asset)
 
-@router.get("/", response_model=List[schemas.Asset])
-def read_assets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    assets = crud.get_assets(db, skip=skip, limit=limit)
-    return assets
+@router.get("/", response_model=List[schemas.Asset], dependencies=[Depends(etag("assets"))])
+async def read_assets(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), after: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    assets = await db.run_sync(crud.get_assets, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, assets)
 
 @router.delete("/{asset_id}", response_model=schemas.Asset)
-def delete_asset(asset_id: int, db: Session = Depends(get_db)):
-    db_asset = crud.delete_asset(db, asset_id=asset_id)
+async def delete_asset(asset_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_asset = await db.run_sync(crud.delete_asset, asset_id=asset_id)
     if db_asset is None:
         raise HTTPException(status_code=404, detail="Asset not found")
     return db_asset
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from .. import database, models, schemas, auth
 
@@ -9,14 +10,32 @@ router = APIRouter(
 )
 
 @router.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
-    if not user or not auth.verify_password(form_data.password, user.hashed_password):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(database.get_async_read_db)):
+    user = (await db.execute(
+        select(models.User.id, models.User.username, models.User.role, models.User.hashed_password)
+        .where(models.User.username == form_data.username)
+    )).first()
+    # Hand the connection back to the pool before the slow password check
+    await db.rollback()
+    if not user or not await auth.check_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if auth.needs_rehash(user.hashed_password):
+        # BCRYPT_ROUNDS changed since this hash was made; the password is at hand, so upgrade it
+        try:
+            hashed_password = await auth.hash_password(form_data.password)
+        except auth.PasswordHasherBusy:
+            # The login itself succeeded; the upgrade is retried at a later login
+            hashed_password = None
+        if hashed_password is not None:
+            async with database.AsyncSessionLocal() as write_db:
+                await write_db.execute(
+                    update(models.User).where(models.User.id == user.id).values(hashed_password=hashed_password)
+                )
+                await write_db.commit()
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
         data={"sub": user.username, "role": user.role}, expires_delta=access_token_expires
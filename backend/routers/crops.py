@@ -1,9 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from datetime import datetime, timedelta
-from .. import crud, models, schemas
-from ..database import SessionLocal
+from datetime import date
+from .. import crud, fieldsets, formats, models, schemas
+from ..pagination import MAX_LIMIT, set_next_cursor
+from ..conditional import etag
+from ..database import get_async_db, get_async_read_db
 
 router = APIRouter(
     prefix="/crops",
@@ -11,64 +13,86 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.Crop)
-def create_crop(crop: schemas.CropCreate, db: Session = Depends(get_db)):
+async def create_crop(crop: schemas.CropCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new crop planting record"""
-    return crud.create_crop(db=db, crop=crop)
+    return await db.run_sync(crud.create_crop, crop=crop)
 
-@router.get("/", response_model=List[schemas.Crop])
-def read_crops(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/", response_model=List[schemas.Crop], dependencies=[Depends(etag("crops"))])
+async def read_crops(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: str = "id",
+    land_id: Optional[int] = None,
+    status: Optional[str] = None,
+    planted_from: Optional[date] = None,
+    planted_to: Optional[date] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
     """Get all crops"""
-    crops = crud.get_crops(db, skip=skip, limit=limit)
+    filters = {"land_id": land_id, "status": status, "planted_from": planted_from, "planted_to": planted_to}
+    fmt = formats.negotiate(request, response, format)
+    selected = fieldsets.parse_fields(fields, schemas.Crop)
+    if fmt != formats.JSON and selected is None:
+        selected = tuple(schemas.Crop.model_fields)
+    crops = set_next_cursor(response, await db.run_sync(crud.get_crops, skip=skip, limit=limit, after=after, sort=sort, filters=filters, fields=selected))
+    if fmt != formats.JSON:
+        return formats.respond(fmt, formats.columnar(selected, crops), response)
+    if selected:
+        return fieldsets.respond(crops, schemas.Crop, selected, response)
     return crops
 
-@router.get("/land/{land_id}", response_model=List[schemas.Crop])
-def read_crops_by_land(land_id: int, db: Session = Depends(get_db)):
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def create_crops_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Create many crops in one transaction"""
+    return await db.run_sync(crud.bulk_create_crops, rows)
+
+@router.put("/bulk", response_model=schemas.BulkResult)
+async def update_crops_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Update many crops in one transaction; each row carries its id"""
+    return await db.run_sync(crud.bulk_update_crops, rows)
+
+@router.delete("/bulk", response_model=schemas.BulkResult)
+async def delete_crops_bulk(payload: schemas.BulkDelete, db: AsyncSession = Depends(get_async_db)):
+    """Delete many crops in one transaction"""
+    return await db.run_sync(crud.bulk_delete_crops, payload.ids)
+
+@router.get("/land/{land_id}", response_model=List[schemas.Crop], dependencies=[Depends(etag("crops"))])
+async def read_crops_by_land(land_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get all crops for a specific land"""
-    crops = crud.get_crops_by_land(db, land_id=land_id)
+    crops = await db.run_sync(crud.get_crops_by_land, land_id=land_id)
     return crops
 
 @router.get("/land/{land_id}/4months", response_model=List[schemas.Crop])
-def read_crops_by_land_4months(land_id: int, db: Session = Depends(get_db)):
+async def read_crops_by_land_4months(land_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get crops for a specific land for the next 4 months"""
-    current_date = datetime.utcnow()
-    four_months_later = current_date + timedelta(days=120)  # Approximately 4 months
-    
-    crops = db.query(models.Crop).filter(
-        models.Crop.land_id == land_id,
-        models.Crop.planting_date >= current_date,
-        models.Crop.expected_harvest_date <= four_months_later
-    ).all()
-    
-    return crops
+    return await db.run_sync(crud.get_upcoming_crops_by_land, land_id=land_id)
 
-@router.get("/{crop_id}", response_model=schemas.Crop)
-def read_crop(crop_id: int, db: Session = Depends(get_db)):
+@router.get("/{crop_id}", response_model=schemas.Crop, dependencies=[Depends(etag("crops"))])
+async def read_crop(crop_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """Get detailed information about a specific crop"""
-    db_crop = crud.get_crop(db, crop_id=crop_id)
+    db_crop = await db.run_sync(crud.get_crop, crop_id=crop_id)
     if db_crop is None:
         raise HTTPException(status_code=404, detail="Crop not found")
     return db_crop
 
 @router.put("/{crop_id}", response_model=schemas.Crop)
-def update_crop(crop_id: int, crop: schemas.CropUpdate, db: Session = Depends(get_db)):
+async def update_crop(crop_id: int, crop: schemas.CropUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update crop information (e.g., mark as harvested, update yield)"""
-    db_crop = crud.update_crop(db, crop_id=crop_id, crop=crop)
+    db_crop = await db.run_sync(crud.update_crop, crop_id=crop_id, crop=crop)
     if db_crop is None:
         raise HTTPException(status_code=404, detail="Crop not found")
     return db_crop
 
 @router.delete("/{crop_id}", response_model=schemas.Crop)
-def delete_crop(crop_id: int, db: Session = Depends(get_db)):
+async def delete_crop(crop_id: int, db: AsyncSession = Depends(get_async_db)):
     """Delete a crop record"""
-    db_crop = crud.delete_crop(db, crop_id=crop_id)
+    db_crop = await db.run_sync(crud.delete_crop, crop_id=crop_id)
     if db_crop is None:
         raise HTTPException(status_code=404, detail="Crop not found")
     return db_crop
@@ -0,0 +1,100 @@
+import csv
+import io
+from datetime import date, datetime
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from .. import models, reporting
+from ..database import ReadSessionLocal
+from ..responses import dumps
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Rows fetched from the cursor per round trip, and rows written per chunk
+YIELD_PER = 1000
+CHUNK_ROWS = 500
+
+def _table_export(model):
+    columns = list(model.__table__.columns)
+
+    def query(db):
+        return db.query(*columns).order_by(model.id)
+
+    return query, lambda row: row._asdict()
+
+EXPORTS = {
+    "transactions": _table_export(models.Transaction),
+    "tasks": _table_export(models.Task),
+    "crops": _table_export(models.Crop),
+    "lands": _table_export(models.Land),
+    "farmer-report": (reporting.farmer_report_query, reporting.format_farmer_row),
+    "item-report": (reporting.item_report_query, reporting.format_item_row),
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+def _csv_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def _rows(resource: str):
+    """Yield formatted rows from a server-side cursor on a dedicated session."""
+    query, format_row = EXPORTS[resource]
+    db = ReadSessionLocal()
+    try:
+        for row in query(db).yield_per(YIELD_PER):
+            yield format_row(row)
+    finally:
+        db.close()
+
+def _stream_csv(rows):
+    buffer = io.StringIO()
+    writer = None
+    count = 0
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row))
+            writer.writeheader()
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        count += 1
+        # Send the header with the first row, then flush in fixed-size chunks
+        if count == 1 or count % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _stream_ndjson(rows):
+    lines = []
+    count = 0
+    for row in rows:
+        lines.append(dumps(row))
+        count += 1
+        if count == 1 or len(lines) >= CHUNK_ROWS:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+@router.get("/{resource}.{fmt}")
+def export_resource(resource: str, fmt: str):
+    """Stream a table or report as CSV or newline-delimited JSON"""
+    if resource not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Export not found")
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=404, detail="Export format not supported")
+
+    stream = _stream_csv if fmt == "csv" else _stream_ndjson
+    return StreamingResponse(
+        stream(_rows(resource)),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{resource}.{fmt}"'},
+    )
@@ -1,10 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, models, schemas
-from ..database import SessionLocal, engine
-
-models.Base.metadata.create_all(bind=engine)
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from .. import crud, fieldsets, schemas
+from ..pagination import MAX_LIMIT, set_next_cursor
+from ..conditional import etag
+from ..database import get_async_db, get_async_read_db
 
 router = APIRouter(
     prefix="/farmers",
@@ -12,40 +12,52 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.Farmer)
-def create_farmer(farmer: schemas.FarmerCreate, db: Session = Depends(get_db)):
-    return crud.create_farmer(db=db, farmer=farmer)
-
-@router.get("/", response_model=List[schemas.Farmer])
-def read_farmers(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    farmers = crud.get_farmers(db, skip=skip, limit=limit)
+async def create_farmer(farmer: schemas.FarmerCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_farmer, farmer=farmer)
+
+@router.get("/", response_model=List[schemas.Farmer], dependencies=[Depends(etag("farmers"))])
+async def read_farmers(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    after: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    selected = fieldsets.parse_fields(fields, schemas.Farmer)
+    farmers = set_next_cursor(response, await db.run_sync(crud.get_farmers, skip=skip, limit=limit, after=after, fields=selected))
+    if selected:
+        return fieldsets.respond(farmers, schemas.Farmer, selected, response)
     return farmers
 
-@router.get("/{farmer_id}", response_model=schemas.Farmer)
-def read_farmer(farmer_id: int, db: Session = Depends(get_db)):
-    db_farmer = crud.get_farmer(db, farmer_id=farmer_id)
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def create_farmers_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Create many farmers in one transaction"""
+    return await db.run_sync(crud.bulk_create_farmers, rows)
+
+@router.delete("/bulk", response_model=schemas.BulkResult)
+async def delete_farmers_bulk(payload: schemas.BulkDelete, db: AsyncSession = Depends(get_async_db)):
+    """Delete many farmers in one transaction"""
+    return await db.run_sync(crud.bulk_delete_farmers, payload.ids)
+
+@router.get("/{farmer_id}", response_model=schemas.Farmer, dependencies=[Depends(etag("farmers"))])
+async def read_farmer(farmer_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    db_farmer = await db.run_sync(crud.get_farmer, farmer_id=farmer_id)
     if db_farmer is None:
         raise HTTPException(status_code=404, detail="Farmer not found")
     return db_farmer
 
 @router.put("/{farmer_id}", response_model=schemas.Farmer)
-def update_farmer(farmer_id: int, farmer: schemas.FarmerCreate, db: Session = Depends(get_db)):
-    db_farmer = crud.update_farmer(db, farmer_id=farmer_id, farmer=farmer)
+async def update_farmer(farmer_id: int, farmer: schemas.FarmerCreate, db: AsyncSession = Depends(get_async_db)):
+    db_farmer = await db.run_sync(crud.update_farmer, farmer_id=farmer_id, farmer=farmer)
     if db_farmer is None:
         raise HTTPException(status_code=404, detail="Farmer not found")
     return db_farmer
 
 @router.delete("/{farmer_id}", response_model=schemas.Farmer)
-def delete_farmer(farmer_id: int, db: Session = Depends(get_db)):
-    db_farmer = crud.delete_farmer(db, farmer_id=farmer_id)
+async def delete_farmer(farmer_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_farmer = await db.run_sync(crud.delete_farmer, farmer_id=farmer_id)
     if db_farmer is None:
         raise HTTPException(status_code=404, detail="Farmer not found")
     return db_farmer
@@ -0,0 +1,37 @@
+import io
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from .. import importer
+from ..database import SessionLocal
+
+router = APIRouter(
+    prefix="/import",
+    tags=["import"],
+    responses={404: {"description": "Not found"}},
+)
+
+# Rejected rows returned in the response; the rest are only counted
+REJECT_SAMPLE_SIZE = 100
+
+@router.post("/{resource}")
+def import_resource(resource: str, file: UploadFile = File(...)):
+    """Import farmers, lands or crops from an uploaded CSV file"""
+    if resource not in importer.RESOURCES:
+        raise HTTPException(status_code=404, detail="Import not found")
+
+    rejects = []
+
+    def reject(line_number, row, error):
+        if len(rejects) < REJECT_SAMPLE_SIZE:
+            rejects.append({"line": line_number, "row": row, "error": error})
+
+    # The upload is spooled to disk by Starlette; read it back a line at a time
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    db = SessionLocal()
+    try:
+        summary = importer.import_csv(db, resource, stream, on_reject=reject)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="CSV file must be UTF-8 encoded")
+    finally:
+        stream.detach()
+        db.close()
+    return {**summary, "rejects": rejects}
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, models, schemas
-from ..database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime, timezone
+from .. import crud, fieldsets, formats, ingest, models, schemas, stock
+from ..pagination import MAX_LIMIT, set_next_cursor
+from ..conditional import etag
+from ..database import begin_snapshot, get_async_db, get_async_read_db, run_write
 
 router = APIRouter(
     prefix="/items",
@@ -10,41 +13,97 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.Item)
-def create_item(item: schemas.ItemCreate, db: Session = Depends(get_db)):
-    return crud.create_item(db=db, item=item)
+async def create_item(item: schemas.ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_item, item=item)
+
+@router.get("/", response_model=List[schemas.Item], dependencies=[Depends(etag("items"))])
+async def read_items(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), after: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    items = await db.run_sync(crud.get_items, skip=skip, limit=limit, after=after)
+    return set_next_cursor(response, items)
+
+# Stock at a point in time, from the nearest snapshot and the ledger since
+STOCK_TABLES = ("items", "transactions")
+
+def _at(at: Optional[datetime]) -> datetime:
+    if at is None:
+        return datetime.utcnow()
+    # The ledger stores naive UTC datetimes
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at
+
+def _stock_at(session, item_id: int, at: datetime):
+    begin_snapshot(session)
+    return stock.stock_at(session, item_id, at)
 
-@router.get("/", response_model=List[schemas.Item])
-def read_items(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    items = crud.get_items(db, skip=skip, limit=limit)
-    return items
+def _stock_at_all(session, at: datetime):
+    begin_snapshot(session)
+    return stock.stock_at_all(session, at)
+
+@router.get("/stock", response_model=List[schemas.ItemStock], dependencies=[Depends(etag(*STOCK_TABLES))])
+async def read_stock(at: Optional[datetime] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """Stock of every item at the start of `at` (default: now)"""
+    return await db.run_sync(_stock_at_all, _at(at))
+
+@router.get("/{item_id}/stock", response_model=schemas.ItemStock, dependencies=[Depends(etag(*STOCK_TABLES))])
+async def read_item_stock(item_id: int, at: Optional[datetime] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """Stock of one item at the start of `at` (default: now)"""
+    item_stock = await db.run_sync(_stock_at, item_id, _at(at))
+    if item_stock is None:
+        raise HTTPException(status_code=404, detail="Item not found")
+    return item_stock
 
 @router.put("/{item_id}", response_model=schemas.Item)
-def update_item(item_id: int, item: schemas.ItemCreate, db: Session = Depends(get_db)):
-    db_item = crud.update_item(db, item_id=item_id, item=item)
+async def update_item(item_id: int, item: schemas.ItemCreate, db: AsyncSession = Depends(get_async_db)):
+    db_item = await db.run_sync(crud.update_item, item_id=item_id, item=item)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 
 @router.delete("/{item_id}", response_model=schemas.Item)
-def delete_item(item_id: int, db: Session = Depends(get_db)):
-    db_item = crud.delete_item(db, item_id=item_id)
+async def delete_item(item_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_item = await db.run_sync(crud.delete_item, item_id=item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 
 @router.post("/transactions/", response_model=schemas.Transaction)
-def create_transaction(transaction: schemas.TransactionCreate, db: Session = Depends(get_db)):
-    return crud.create_transaction(db=db, transaction=transaction)
+async def create_transaction(transaction: schemas.TransactionCreate, db: AsyncSession = Depends(get_async_db)):
+    if ingest.batcher.running:
+        # Committed together with other queued transactions; see ingest.py
+        return await ingest.batcher.submit(transaction)
+    return await run_write(db, crud.create_transaction, transaction=transaction)
+
+@router.post("/transactions/bulk", response_model=schemas.BulkResult)
+async def create_transactions_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Record many transactions in one transaction, adjusting item quantities in aggregate"""
+    return await run_write(db, crud.bulk_create_transactions, rows)
 
-@router.get("/transactions/", response_model=List[schemas.Transaction])
-def read_transactions(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    transactions = crud.get_transactions(db, skip=skip, limit=limit)
+@router.get("/transactions/", response_model=List[schemas.Transaction], dependencies=[Depends(etag("transactions"))])
+async def read_transactions(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: str = "id",
+    item_id: Optional[int] = None,
+    type: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    fields: Optional[str] = None,
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    filters = {"item_id": item_id, "type": type, "date_from": date_from, "date_to": date_to}
+    fmt = formats.negotiate(request, response, format)
+    selected = fieldsets.parse_fields(fields, schemas.Transaction)
+    if fmt != formats.JSON and selected is None:
+        selected = tuple(schemas.Transaction.model_fields)
+    transactions = set_next_cursor(response, await db.run_sync(crud.get_transactions, skip=skip, limit=limit, after=after, sort=sort, filters=filters, fields=selected))
+    if fmt != formats.JSON:
+        return formats.respond(fmt, formats.columnar(selected, transactions), response)
+    if selected:
+        return fieldsets.respond(transactions, schemas.Transaction, selected, response)
     return transactions
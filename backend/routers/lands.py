@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, models, schemas
-from ..database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+from .. import crud, fieldsets, models, occupancy, schemas
+from ..pagination import MAX_LIMIT, set_next_cursor
+from ..conditional import etag
+from ..database import get_async_db, get_async_read_db
 
 router = APIRouter(
     prefix="/lands",
@@ -10,47 +13,81 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.Land)
-def create_land(land: schemas.LandCreate, db: Session = Depends(get_db)):
-    return crud.create_land(db=db, land=land)
+async def create_land(land: schemas.LandCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_land, land=land)
 
-@router.get("/", response_model=List[schemas.Land])
-def read_lands(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    lands = crud.get_lands(db, skip=skip, limit=limit)
+@router.get("/", response_model=List[schemas.Land], dependencies=[Depends(etag("lands"))])
+async def read_lands(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: str = "id",
+    farmer_id: Optional[int] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    filters = {"farmer_id": farmer_id}
+    selected = fieldsets.parse_fields(fields, schemas.Land)
+    lands = set_next_cursor(response, await db.run_sync(crud.get_lands, skip=skip, limit=limit, after=after, sort=sort, filters=filters, fields=selected))
+    if selected:
+        return fieldsets.respond(lands, schemas.Land, selected, response)
     return lands
 
-@router.get("/{land_id}", response_model=schemas.Land)
-def read_land(land_id: int, db: Session = Depends(get_db)):
-    db_land = crud.get_land(db, land_id=land_id)
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def create_lands_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Create many lands in one transaction"""
+    return await db.run_sync(crud.bulk_create_lands, rows)
+
+@router.put("/bulk", response_model=schemas.BulkResult)
+async def update_lands_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Update many lands in one transaction; each row carries its id"""
+    return await db.run_sync(crud.bulk_update_lands, rows)
+
+@router.delete("/bulk", response_model=schemas.BulkResult)
+async def delete_lands_bulk(payload: schemas.BulkDelete, db: AsyncSession = Depends(get_async_db)):
+    """Delete many lands in one transaction"""
+    return await db.run_sync(crud.bulk_delete_lands, payload.ids)
+
+@router.get("/availability", response_model=List[schemas.Land], dependencies=[Depends(etag("lands", "crops"))])
+async def read_land_availability(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    min_size: Optional[float] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Lands with no crop planted between `from` and `to`, optionally at least `min_size` large"""
+    start, end = occupancy.naive_utc(start), occupancy.naive_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="'to' must be after 'from'")
+    return await db.run_sync(occupancy.free_lands, start, end, min_size)
+
+@router.get("/{land_id}", response_model=schemas.Land, dependencies=[Depends(etag("lands"))])
+async def read_land(land_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    db_land = await db.run_sync(crud.get_land, land_id=land_id)
     if db_land is None:
         raise HTTPException(status_code=404, detail="Land not found")
     return db_land
 
 @router.put("/{land_id}", response_model=schemas.Land)
-def update_land(land_id: int, land: schemas.LandUpdate, db: Session = Depends(get_db)):
-    db_land = crud.update_land(db, land_id=land_id, land=land)
+async def update_land(land_id: int, land: schemas.LandUpdate, db: AsyncSession = Depends(get_async_db)):
+    db_land = await db.run_sync(crud.update_land, land_id=land_id, land=land)
     if db_land is None:
         raise HTTPException(status_code=404, detail="Land not found")
     return db_land
 
 @router.delete("/{land_id}", response_model=schemas.Land)
-def delete_land(land_id: int, db: Session = Depends(get_db)):
-    db_land = crud.delete_land(db, land_id=land_id)
+async def delete_land(land_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_land = await db.run_sync(crud.delete_land, land_id=land_id)
     if db_land is None:
         raise HTTPException(status_code=404, detail="Land not found")
     return db_land
 
 @router.put("/{land_id}/assign/{farmer_id}", response_model=schemas.Land)
-def assign_land_to_farmer(land_id: int, farmer_id: int, db: Session = Depends(get_db)):
+async def assign_land_to_farmer(land_id: int, farmer_id: int, db: AsyncSession = Depends(get_async_db)):
     """Assign a land to a farmer"""
-    db_land = crud.assign_land_to_farmer(db, land_id=land_id, farmer_id=farmer_id)
+    db_land = await db.run_sync(crud.assign_land_to_farmer, land_id=land_id, farmer_id=farmer_id)
     if db_land is None:
         raise HTTPException(status_code=404, detail="Land not found")
     return db_land
@@ -1,180 +1,118 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from .. import models
-from ..database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from datetime import date
+from .. import costing, formats, reporting, rollup
+from ..cache import report_cache
+from ..conditional import etag
+from ..database import get_async_db, get_async_read_db, run_write
+from ..responses import encoded_response
 
 router = APIRouter(
     prefix="/reports",
     tags=["reports"],
 )
 
-def get_db():
-    db = SessionLocal()
+# Tables each report reads; a write to any of them invalidates its cached results.
+# Derived tables are listed too, so the offline rebuilds invalidate the reports built on them
+SUMMARY_TABLES = ("farmers", "tasks", "items", "transactions", "assets", "report_rollup")
+FARMER_REPORT_TABLES = ("farmers", "tasks")
+ITEM_REPORT_TABLES = ("items", "transactions")
+TRANSACTION_TABLES = ("transactions",)
+TIMESERIES_TABLES = ("transactions", "transaction_daily")
+COST_BASIS_TABLES = ("items", "transactions", "cost_basis_checkpoints")
+
+async def _cached(db: AsyncSession, key: tuple, tables: tuple, compute, response: Response, fmt: str = formats.JSON, write: bool = False):
+    """Serve a report from the cache, which holds it already encoded in `fmt`.
+
+    On a miss `compute(session)` runs once on the sync side of `db`; with
+    `write`, through run_write, for reports that store state as they go.
+    """
+    def build(session):
+        return formats.encode(fmt, compute(session))
+    run = (lambda: run_write(db, build)) if write else (lambda: db.run_sync(build))
     try:
-        yield db
-    finally:
-        db.close()
+        body = await report_cache.get_or_compute_async(key + (fmt,), tables, run)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return encoded_response(body, response, formats.MEDIA_TYPES[fmt])
 
-@router.get("/summary")
-def get_summary_report(db: Session = Depends(get_db)):
+@router.get("/summary", dependencies=[Depends(etag(*SUMMARY_TABLES))])
+async def get_summary_report(response: Response, db: AsyncSession = Depends(get_async_read_db)):
     """Get overall summary statistics"""
-    
-    # Farmer stats
-    total_farmers = db.query(func.count(models.Farmer.id)).scalar()
-    
-    # Task stats
-    total_tasks = db.query(func.count(models.Task.id)).scalar()
-    pending_tasks = db.query(func.count(models.Task.id)).filter(models.Task.status == "Pending").scalar()
-    completed_tasks = db.query(func.count(models.Task.id)).filter(models.Task.status == "Completed").scalar()
-    
-    # Item stats
-    total_items = db.query(func.count(models.Item.id)).scalar()
-    total_inventory_value = db.query(func.sum(models.Item.quantity * models.Item.price)).scalar() or 0
-    
-    # Transaction stats
-    total_transactions = db.query(func.count(models.Transaction.id)).scalar()
-    total_purchases = db.query(func.count(models.Transaction.id)).filter(models.Transaction.type == "buy").scalar()
-    total_sales = db.query(func.count(models.Transaction.id)).filter(models.Transaction.type == "sell").scalar()
-    
-    total_purchase_amount = db.query(func.sum(models.Transaction.total_price)).filter(
-        models.Transaction.type == "buy"
-    ).scalar() or 0
-    
-    total_sales_amount = db.query(func.sum(models.Transaction.total_price)).filter(
-        models.Transaction.type == "sell"
-    ).scalar() or 0
-    
-    # Asset stats
-    total_assets = db.query(func.count(models.Asset.id)).scalar()
-    total_asset_value = db.query(func.sum(models.Asset.value)).scalar() or 0
-    
-    return {
-        "farmers": {
-            "total": total_farmers
-        },
-        "tasks": {
-            "total": total_tasks,
-            "pending": pending_tasks,
-            "completed": completed_tasks,
-            "in_progress": total_tasks - pending_tasks - completed_tasks
-        },
-        "items": {
-            "total": total_items,
-            "inventory_value": round(total_inventory_value, 2)
-        },
-        "transactions": {
-            "total": total_transactions,
-            "purchases": total_purchases,
-            "sales": total_sales,
-            "total_purchase_amount": round(total_purchase_amount, 2),
-            "total_sales_amount": round(total_sales_amount, 2),
-            "net_profit": round(total_sales_amount - total_purchase_amount, 2)
-        },
-        "assets": {
-            "total": total_assets,
-            "total_value": round(total_asset_value, 2)
-        }
-    }
+    return await _cached(
+        db, ("summary",), SUMMARY_TABLES,
+        lambda session: reporting.format_summary(rollup.read(session)),
+        response,
+    )
 
-@router.get("/farmers")
-def get_farmer_report(db: Session = Depends(get_db)):
+@router.get("/farmers", dependencies=[Depends(etag(*FARMER_REPORT_TABLES))])
+async def get_farmer_report(response: Response, skip: int = 0, limit: Optional[int] = Query(None, ge=1), sort: str = "id", db: AsyncSession = Depends(get_async_read_db)):
     """Get detailed farmer report with task counts"""
-    farmers = db.query(models.Farmer).all()
-    
-    farmer_data = []
-    for farmer in farmers:
-        task_count = db.query(func.count(models.Task.id)).filter(
-            models.Task.farmer_id == farmer.id
-        ).scalar()
-        
-        completed_tasks = db.query(func.count(models.Task.id)).filter(
-            models.Task.farmer_id == farmer.id,
-            models.Task.status == "Completed"
-        ).scalar()
-        
-        farmer_data.append({
-            "id": farmer.id,
-            "name": farmer.name,
-            "phone": farmer.phone,
-            "address": farmer.address,
-            "total_tasks": task_count,
-            "completed_tasks": completed_tasks,
-            "pending_tasks": task_count - completed_tasks
-        })
-    
-    return farmer_data
+    return await _cached(
+        db, ("farmers", skip, limit, sort), FARMER_REPORT_TABLES,
+        lambda session: reporting.farmer_report(session, skip=skip, limit=limit, sort=sort),
+        response,
+    )
 
-@router.get("/items")
-def get_item_report(db: Session = Depends(get_db)):
-    """Get detailed item report with transaction history"""
-    items = db.query(models.Item).all()
-    
-    item_data = []
-    for item in items:
-        buy_count = db.query(func.count(models.Transaction.id)).filter(
-            models.Transaction.item_id == item.id,
-            models.Transaction.type == "buy"
-        ).scalar()
-        
-        sell_count = db.query(func.count(models.Transaction.id)).filter(
-            models.Transaction.item_id == item.id,
-            models.Transaction.type == "sell"
-        ).scalar()
-        
-        total_bought = db.query(func.sum(models.Transaction.quantity)).filter(
-            models.Transaction.item_id == item.id,
-            models.Transaction.type == "buy"
-        ).scalar() or 0
-        
-        total_sold = db.query(func.sum(models.Transaction.quantity)).filter(
-            models.Transaction.item_id == item.id,
-            models.Transaction.type == "sell"
-        ).scalar() or 0
-        
-        item_data.append({
-            "id": item.id,
-            "name": item.name,
-            "type": item.type,
-            "current_quantity": item.quantity,
-            "price_per_unit": item.price,
-            "inventory_value": round(item.quantity * item.price, 2),
-            "total_bought": total_bought,
-            "total_sold": total_sold,
-            "buy_transactions": buy_count,
-            "sell_transactions": sell_count
-        })
-    
-    return item_data
+@router.get("/items", dependencies=[Depends(etag(*ITEM_REPORT_TABLES))])
+async def get_item_report(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: Optional[int] = Query(None, ge=1),
+    sort: str = "id",
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get detailed item report with transaction history, as rows or columns"""
+    fmt = formats.negotiate(request, response, format)
+    build = reporting.item_report if fmt == formats.JSON else reporting.item_report_columns
+    return await _cached(
+        db, ("items", skip, limit, sort), ITEM_REPORT_TABLES,
+        lambda session: build(session, skip=skip, limit=limit, sort=sort),
+        response, fmt,
+    )
 
-@router.get("/transactions/summary")
-def get_transaction_summary(db: Session = Depends(get_db)):
+@router.get("/transactions/summary", dependencies=[Depends(etag(*TRANSACTION_TABLES))])
+async def get_transaction_summary(response: Response, db: AsyncSession = Depends(get_async_read_db)):
     """Get transaction summary by type"""
-    
-    # Buy transactions summary
-    buy_summary = db.query(
-        func.count(models.Transaction.id).label('count'),
-        func.sum(models.Transaction.quantity).label('total_quantity'),
-        func.sum(models.Transaction.total_price).label('total_amount')
-    ).filter(models.Transaction.type == "buy").first()
-    
-    # Sell transactions summary
-    sell_summary = db.query(
-        func.count(models.Transaction.id).label('count'),
-        func.sum(models.Transaction.quantity).label('total_quantity'),
-        func.sum(models.Transaction.total_price).label('total_amount')
-    ).filter(models.Transaction.type == "sell").first()
-    
-    return {
-        "buy": {
-            "transaction_count": buy_summary.count or 0,
-            "total_quantity": buy_summary.total_quantity or 0,
-            "total_amount": round(buy_summary.total_amount or 0, 2)
-        },
-        "sell": {
-            "transaction_count": sell_summary.count or 0,
-            "total_quantity": sell_summary.total_quantity or 0,
-            "total_amount": round(sell_summary.total_amount or 0, 2)
-        },
-        "profit": round((sell_summary.total_amount or 0) - (buy_summary.total_amount or 0), 2)
-    }
+    return await _cached(
+        db, ("transactions/summary",), TRANSACTION_TABLES,
+        lambda session: reporting.transaction_summary(session),
+        response,
+    )
+
+@router.get("/transactions/timeseries", dependencies=[Depends(etag(*TIMESERIES_TABLES))])
+async def get_transaction_timeseries(
+    response: Response,
+    bucket: str = "day",
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    item_id: Optional[int] = None,
+    type: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    """Get buy/sell totals per day, week, month or year"""
+    return await _cached(
+        db, ("transactions/timeseries", bucket, date_from, date_to, item_id, type), TIMESERIES_TABLES,
+        lambda session: reporting.transaction_timeseries(
+            session, bucket=bucket, date_from=date_from, date_to=date_to, item_id=item_id, type=type
+        ),
+        response,
+    )
+
+@router.get("/transactions/cost-basis", dependencies=[Depends(etag(*COST_BASIS_TABLES))])
+async def get_cost_basis_report(response: Response, method: str = "fifo", db: AsyncSession = Depends(get_async_db)):
+    """Get FIFO or weighted-average COGS, realized margin and remaining stock value per item"""
+    return await _cached(
+        db, ("transactions/cost-basis", method), COST_BASIS_TABLES,
+        lambda session: costing.cost_basis_report(session, method=method),
+        response,
+        write=True,
+    )
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Get report cache hit/miss counters"""
+    return report_cache.stats()
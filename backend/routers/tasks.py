@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException # type: ignore
-from sqlalchemy.orm import Session # type: ignore
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response # type: ignore
+from sqlalchemy.ext.asyncio import AsyncSession # type: ignore
+from typing import List, Optional
 from .. import crud, models, schemas
-from ..database import SessionLocal
+from ..pagination import MAX_LIMIT, set_next_cursor
+from ..conditional import etag
+from ..database import get_async_db, get_async_read_db
 
 router = APIRouter(
     prefix="/tasks",
@@ -10,32 +12,50 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/", response_model=schemas.Task)
-def create_task(task: schemas.TaskCreate, db: Session = Depends(get_db)):
-    return crud.create_task(db=db, task=task)
+async def create_task(task: schemas.TaskCreate, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(crud.create_task, task=task)
+
+@router.get("/", response_model=List[schemas.Task], dependencies=[Depends(etag("tasks"))])
+async def read_tasks(
+    response: Response,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: str = "id",
+    farmer_id: Optional[int] = None,
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    filters = {"farmer_id": farmer_id, "status": status}
+    tasks = await db.run_sync(crud.get_tasks, skip=skip, limit=limit, after=after, sort=sort, filters=filters)
+    return set_next_cursor(response, tasks)
+
+@router.post("/bulk", response_model=schemas.BulkResult)
+async def create_tasks_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Create many tasks in one transaction"""
+    return await db.run_sync(crud.bulk_create_tasks, rows)
+
+@router.put("/bulk", response_model=schemas.BulkResult)
+async def update_tasks_bulk(rows: List[dict], db: AsyncSession = Depends(get_async_db)):
+    """Update many tasks in one transaction; each row carries its id"""
+    return await db.run_sync(crud.bulk_update_tasks, rows)
 
-@router.get("/", response_model=List[schemas.Task])
-def read_tasks(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    tasks = crud.get_tasks(db, skip=skip, limit=limit)
-    return tasks
+@router.delete("/bulk", response_model=schemas.BulkResult)
+async def delete_tasks_bulk(payload: schemas.BulkDelete, db: AsyncSession = Depends(get_async_db)):
+    """Delete many tasks in one transaction"""
+    return await db.run_sync(crud.bulk_delete_tasks, payload.ids)
 
 @router.put("/{task_id}", response_model=schemas.Task)
-def update_task(task_id: int, task: schemas.TaskBase, db: Session = Depends(get_db)):
-    db_task = crud.update_task(db, task_id=task_id, task=task)
+async def update_task(task_id: int, task: schemas.TaskBase, db: AsyncSession = Depends(get_async_db)):
+    db_task = await db.run_sync(crud.update_task, task_id=task_id, task=task)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     return db_task
 
 @router.delete("/{task_id}", response_model=schemas.Task)
-def delete_task(task_id: int, db: Session = Depends(get_db)):
-    db_task = crud.delete_task(db, task_id=task_id)
+async def delete_task(task_id: int, db: AsyncSession = Depends(get_async_db)):
+    db_task = await db.run_sync(crud.delete_task, task_id=task_id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     return db_task
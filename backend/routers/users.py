@@ -1,71 +1,84 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from .. import database, models, schemas, auth
+from ..pagination import MAX_LIMIT, paginate, set_next_cursor
+from ..cache import table_generations
 
 router = APIRouter(
     prefix="/users",
     tags=["Users"]
 )
 
+async def _get_user_by_username(db: AsyncSession, username: str):
+    return await db.scalar(select(models.User).where(models.User.username == username))
+
 @router.post("/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_admin_user)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db), current_user: auth.Principal = Depends(auth.get_current_admin_user)):
+    db_user = await _get_user_by_username(db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await auth.hash_password(user.password)
     db_user = models.User(username=user.username, hashed_password=hashed_password, role=user.role, is_active=user.is_active)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/register", response_model=schemas.User)
-def register_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
+    db_user = await _get_user_by_username(db, user.username)
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = auth.get_password_hash(user.password)
+    hashed_password = await auth.hash_password(user.password)
     # Default role for self-registration is 'farmer'
     db_user = models.User(username=user.username, hashed_password=hashed_password, role="farmer", is_active=True)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_admin_user)):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+async def read_users(response: Response, skip: int = 0, limit: int = Query(100, ge=1, le=MAX_LIMIT), after: Optional[str] = None, db: AsyncSession = Depends(database.get_async_read_db), current_user: auth.Principal = Depends(auth.get_current_admin_user)):
+    users = await db.run_sync(
+        lambda session: paginate(session.query(models.User), [(models.User.id, False)], skip=skip, limit=limit, after=after)
+    )
+    return set_next_cursor(response, users)
 
 @router.get("/me", response_model=schemas.User)
-async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
+async def read_users_me(current_user: auth.Principal = Depends(auth.get_current_active_user)):
     return current_user
 
 @router.put("/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_admin_user)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def update_user(user_id: int, user: schemas.UserUpdate, db: AsyncSession = Depends(database.get_async_db), current_user: auth.Principal = Depends(auth.get_current_admin_user)):
+    db_user = await db.get(models.User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    old_username = db_user.username
     if user.username:
         db_user.username = user.username
     if user.password:
-        db_user.hashed_password = auth.get_password_hash(user.password)
+        db_user.hashed_password = await auth.hash_password(user.password)
     if user.role:
         db_user.role = user.role
     if user.is_active is not None:
         db_user.is_active = user.is_active
         
-    db.commit()
-    db.refresh(db_user)
+    await db.run_sync(table_generations.bump, "users")
+    await db.commit()
+    auth.forget_user(old_username, db_user.username)
+    await db.refresh(db_user)
     return db_user
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_admin_user)):
-    db_user = db.query(models.User).filter(models.User.id == user_id).first()
+async def delete_user(user_id: int, db: AsyncSession = Depends(database.get_async_db), current_user: auth.Principal = Depends(auth.get_current_admin_user)):
+    db_user = await db.get(models.User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.run_sync(table_generations.bump, "users")
+    await db.commit()
+    auth.forget_user(db_user.username)
     return {"ok": True}
@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import crud, reporting, rollup, schemas
+from ..cache import report_cache
+from ..conditional import etag
+from ..database import begin_snapshot, get_async_read_db
+from ..responses import dumps, encoded_response
+from .reports import SUMMARY_TABLES
+
+router = APIRouter(
+    prefix="/views",
+    tags=["views"],
+)
+
+# Screen views
+#
+# One request per frontend screen instead of one per list or report. Each view
+# runs its queries on a single session inside one read transaction, so the
+# parts of the payload are consistent with each other.
+
+def _crop_planning(db: Session, land_id: Optional[int]) -> dict:
+    begin_snapshot(db)
+    if land_id:
+        crops = crud.get_upcoming_crops_by_land(db, land_id=land_id)
+    else:
+        crops = crud.get_crops(db)
+    return {"lands": crud.get_lands(db), "crops": crops}
+
+def _inventory(db: Session) -> dict:
+    begin_snapshot(db)
+    return {"items": crud.get_items(db), "transactions": crud.get_transactions(db, sort="-id")}
+
+def _reports(db: Session) -> bytes:
+    begin_snapshot(db)
+    return dumps({
+        "summary": reporting.format_summary(rollup.read(db)),
+        "farmers": reporting.farmer_report(db),
+        "items": reporting.item_report(db),
+        "transactions": reporting.transaction_summary(db),
+    })
+
+@router.get("/crop-planning", response_model=schemas.CropPlanningView)
+async def crop_planning_view(land_id: Optional[int] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """Lands plus all crops, or the next 4 months of crops on `land_id`"""
+    return await db.run_sync(_crop_planning, land_id)
+
+@router.get("/inventory", response_model=schemas.InventoryView, dependencies=[Depends(etag("items", "transactions"))])
+async def inventory_view(db: AsyncSession = Depends(get_async_read_db)):
+    """Items and recent transactions"""
+    return await db.run_sync(_inventory)
+
+@router.get("/reports", dependencies=[Depends(etag(*SUMMARY_TABLES))])
+async def reports_view(response: Response, db: AsyncSession = Depends(get_async_read_db)):
+    """Summary, farmer, item and transaction reports in one payload"""
+    body = await report_cache.get_or_compute_async(("views/reports",), SUMMARY_TABLES, lambda: db.run_sync(_reports))
+    return encoded_response(body, response)
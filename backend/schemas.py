@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import List, Optional
-from datetime import datetime
+from typing import Any, List, Optional
+from datetime import date, datetime
 
 # Farmer Schemas
 class FarmerBase(BaseModel):
@@ -30,6 +30,11 @@ class Task(TaskBase):
     class Config:
         from_attributes = True
 
+class TaskBulkUpdate(BaseModel):
+    id: int
+    description: Optional[str] = None
+    status: Optional[str] = None
+
 # Item Schemas
 class ItemBase(BaseModel):
     name: str
@@ -45,6 +50,15 @@ class Item(ItemBase):
     class Config:
         from_attributes = True
 
+class ItemStock(BaseModel):
+    item_id: int
+    at: datetime
+    quantity: int
+    price: float
+    value: float
+    snapshot_day: Optional[date] = None # None when replayed from the current stock
+    replayed: int # transactions replayed from the anchor
+
 # Transaction Schemas
 class TransactionBase(BaseModel):
     item_id: int
@@ -97,6 +111,9 @@ class LandUpdate(BaseModel):
     tax_amount: Optional[float] = None
     farmer_id: Optional[int] = None
 
+class LandBulkUpdate(LandUpdate):
+    id: int
+
 class Land(LandBase):
     id: int
     farmer_id: Optional[int] = None
@@ -126,6 +143,9 @@ class CropUpdate(BaseModel):
     actual_yield: Optional[float] = None
     notes: Optional[str] = None
 
+class CropBulkUpdate(CropUpdate):
+    id: int
+
 class Crop(CropBase):
     id: int
     land_id: int
@@ -163,3 +183,24 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     username: Optional[str] = None
     role: Optional[str] = None
+
+# Bulk Schemas
+class BulkError(BaseModel):
+    index: int
+    detail: Any
+
+class BulkResult(BaseModel):
+    ids: List[Optional[int]]
+    errors: List[BulkError] = []
+
+class BulkDelete(BaseModel):
+    ids: List[int]
+
+# View Schemas
+class CropPlanningView(BaseModel):
+    lands: List[Land]
+    crops: List[Crop]
+
+class InventoryView(BaseModel):
+    items: List[Item]
+    transactions: List[Transaction]
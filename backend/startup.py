@@ -0,0 +1,145 @@
+import os
+import sys
+import tempfile
+import zlib
+from contextlib import contextmanager
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from . import models, rollup, auth as auth_logic
+from .database import engine, SessionLocal, Base
+
+# Startup initialization
+#
+# Creating the tables and the initial admin user runs once per process from
+# the application's lifespan hook, not at import. With several workers
+# (`uvicorn --workers 8`) they all start at once, so the work is serialized by
+# a lock file next to the database: the first worker creates what is missing
+# while the others wait, then find everything in place.
+#
+# On SQLite a fingerprint of the declared schema is stored in
+# `PRAGMA user_version` once the tables are created. When it matches at the
+# next start only the admin user is looked up, without taking the lock or
+# inspecting every table, so a worker is ready in a few milliseconds.
+#
+# The daily transaction rollup is backfilled from the ledger when it is empty
+# while transactions exist, as on a database from before the rollup.
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin123"
+
+def schema_fingerprint(metadata=Base.metadata) -> int:
+    """A 31-bit checksum of the declared tables, columns and indexes."""
+    parts = []
+    for table in metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name}:{column.type}" for column in table.columns)
+        parts.extend(sorted(index.name for index in table.indexes))
+    # user_version is a signed 32-bit integer; 0 means never set
+    return zlib.crc32("\n".join(parts).encode("utf-8")) & 0x7FFFFFFF or 1
+
+def _lock_path(bind) -> str:
+    database = make_url(str(bind.url)).database
+    if bind.dialect.name == "sqlite" and database and database != ":memory:":
+        return os.path.abspath(database) + ".init.lock"
+    return os.path.join(tempfile.gettempdir(), "farm-api-init.lock")
+
+@contextmanager
+def _file_lock(path: str):
+    """An exclusive lock on `path` held across processes, released on exit."""
+    with open(path, "a+b") as handle:
+        if sys.platform == "win32":
+            import msvcrt
+
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after about ten seconds; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+def _schema_current(bind, fingerprint: int) -> bool:
+    if bind.dialect.name != "sqlite":
+        return False
+    with bind.connect() as connection:
+        return connection.execute(text("PRAGMA user_version")).scalar() == fingerprint
+
+def _mark_schema_current(bind, fingerprint: int):
+    if bind.dialect.name == "sqlite":
+        with bind.begin() as connection:
+            connection.execute(text(f"PRAGMA user_version = {int(fingerprint)}"))
+
+def _admin_exists(db) -> bool:
+    return db.query(models.User.id).filter(models.User.username == ADMIN_USERNAME).first() is not None
+
+def create_schema(bind=engine):
+    Base.metadata.create_all(bind=bind)
+    # create_all skips tables that already exist, so add indexes declared since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+def create_initial_admin(db):
+    if not _admin_exists(db):
+        hashed_password = auth_logic.get_password_hash(ADMIN_PASSWORD)
+        db.add(models.User(username=ADMIN_USERNAME, hashed_password=hashed_password, role="admin"))
+        db.commit()
+        print("Created initial admin user")
+
+def _ready(bind, fingerprint: int) -> bool:
+    """The fast path: the schema is current and the admin user exists."""
+    if bind.dialect.name != "sqlite":
+        return False
+    # Plain SQL on purpose; the first ORM query in a process costs tens of
+    # milliseconds to configure the mappers and compile
+    with bind.connect() as connection:
+        if connection.execute(text("PRAGMA user_version")).scalar() != fingerprint:
+            return False
+        admin = connection.execute(
+            text("SELECT 1 FROM users WHERE username = :username"), {"username": ADMIN_USERNAME}
+        ).first()
+        if admin is None:
+            return False
+        daily_missing = connection.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM transactions) AND NOT EXISTS (SELECT 1 FROM transaction_daily)"
+        )).scalar()
+        return not daily_missing
+
+def initialize(bind=engine, session_factory=SessionLocal) -> bool:
+    """Create missing tables, indexes and the admin user; safe to run from many workers.
+
+    Returns True when there was nothing to do.
+    """
+    fingerprint = schema_fingerprint()
+    # This is also the first connection of the process, so the writer creates
+    # the file and switches it to WAL before a read-only connection opens it
+    if _ready(bind, fingerprint):
+        return True
+
+    with _file_lock(_lock_path(bind)):
+        # Another worker may have finished while this one waited
+        if not _schema_current(bind, fingerprint):
+            create_schema(bind)
+        db = session_factory()
+        try:
+            create_initial_admin(db)
+            if rollup.ensure_daily(db):
+                print("Built the daily transaction rollup from the ledger")
+        finally:
+            db.close()
+        _mark_schema_current(bind, fingerprint)
+    return False
@@ -0,0 +1,214 @@
+import argparse
+import sys
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+from . import models
+
+# Stock history
+#
+# Item.quantity only holds the current stock. So that "what was the stock on
+# March 1st" does not mean replaying the whole ledger, the stock and value of
+# every item is checkpointed at the end of a day into item_stock_snapshots.
+# A stock-at-date query starts from the nearest anchor, which is the snapshot
+# just before, the snapshot just after or the current stock, and replays only
+# the transactions between that anchor and the requested time.
+#
+# Snapshots are derived from the current stock minus the transactions
+# recorded since the end of the day, so a day can be checkpointed after the
+# fact. `take` is meant to run daily; daily snapshots older than KEEP_DAYS are
+# then thinned out to month-ends. Quantities set directly on an item
+# (PUT /items/{id}) are not in the ledger, so replays across such an edit
+# are off by the difference.
+
+KEEP_DAYS = 62
+
+def _end_of(day: date) -> datetime:
+    return datetime.combine(day + timedelta(days=1), time.min)
+
+def _is_month_end(day: date) -> bool:
+    return (day + timedelta(days=1)).day == 1
+
+def _signed_quantity():
+    transaction = models.Transaction
+    return case(
+        (transaction.type == "buy", transaction.quantity),
+        (transaction.type == "sell", -transaction.quantity),
+        else_=0,
+    )
+
+def _net(db: Session, start: datetime, end: Optional[datetime], item_id: Optional[int] = None) -> dict:
+    """`{item_id: (net quantity, transactions)}` for transactions dated in [start, end)."""
+    transaction = models.Transaction
+    query = db.query(
+        transaction.item_id,
+        func.coalesce(func.sum(_signed_quantity()), 0),
+        func.count(transaction.id),
+    ).filter(transaction.date >= start, transaction.type.in_(("buy", "sell")))
+    if end is not None:
+        query = query.filter(transaction.date < end)
+    if item_id is not None:
+        query = query.filter(transaction.item_id == item_id)
+    return {row[0]: (row[1], row[2]) for row in query.group_by(transaction.item_id)}
+
+# Snapshots
+def take(db: Session, days) -> int:
+    """Write the stock of every item at the end of each of `days`, which must have ended.
+
+    Returns the number of rows written.
+    """
+    items = db.query(models.Item.id, models.Item.quantity, models.Item.price).all()
+    rows = []
+    for day in sorted(set(days)):
+        since = _net(db, _end_of(day), None)
+        for item_id, quantity, price in items:
+            quantity = (quantity or 0) - since.get(item_id, (0, 0))[0]
+            price = price or 0
+            rows.append({"item_id": item_id, "day": day, "quantity": quantity, "price": price, "value": quantity * price})
+    if rows:
+        # Replace the snapshots these days already have for the current items
+        snapshot = models.ItemStockSnapshot
+        db.execute(
+            delete(snapshot)
+            .where(snapshot.day.in_(sorted(set(days))), snapshot.item_id.in_(select(models.Item.id)))
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(insert(snapshot), rows)
+    return len(rows)
+
+def backfill_days(db: Session, today: date) -> list:
+    """Every month-end since the first transaction, plus yesterday."""
+    first = db.query(func.min(models.Transaction.date)).scalar()
+    yesterday = today - timedelta(days=1)
+    days = [yesterday]
+    if first is not None:
+        month = first.date().replace(day=1)
+        while True:
+            month_end = (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+            if month_end >= yesterday:
+                break
+            days.append(month_end)
+            month = month_end + timedelta(days=1)
+    return days
+
+def prune(db: Session, today: date, keep_days: int = KEEP_DAYS) -> int:
+    """Delete daily snapshots older than `keep_days`, keeping month-ends."""
+    snapshot = models.ItemStockSnapshot
+    cutoff = today - timedelta(days=keep_days)
+    old_days = [row[0] for row in db.query(snapshot.day).filter(snapshot.day < cutoff).distinct()]
+    stale = [day for day in old_days if not _is_month_end(day)]
+    if not stale:
+        return 0
+    return db.execute(delete(snapshot).where(snapshot.day.in_(stale))).rowcount
+
+# Stock at a point in time
+def _nearest_day(db: Session, at: datetime, now: datetime, item_id: Optional[int] = None) -> Optional[date]:
+    """The snapshot day closest to `at`, or None when the current stock is closer."""
+    snapshot = models.ItemStockSnapshot
+    query = db.query(snapshot.day)
+    if item_id is not None:
+        query = query.filter(snapshot.item_id == item_id)
+    # The snapshot of day D is the stock at the start of D + 1
+    before = query.filter(snapshot.day < at.date()).order_by(snapshot.day.desc()).limit(1).scalar()
+    after = query.filter(snapshot.day >= at.date()).order_by(snapshot.day).limit(1).scalar()
+    best, best_distance = None, abs(now - at)
+    for day in (before, after):
+        if day is not None and abs(_end_of(day) - at) < best_distance:
+            best, best_distance = day, abs(_end_of(day) - at)
+    return best
+
+def _replay(db: Session, anchor: datetime, at: datetime, item_id: Optional[int] = None) -> dict:
+    """Signed stock change from `anchor` to `at`, replaying only the transactions in between."""
+    if anchor <= at:
+        return _net(db, anchor, at, item_id)
+    return {key: (-net, count) for key, (net, count) in _net(db, at, anchor, item_id).items()}
+
+def _stock(item_id: int, at: datetime, quantity: int, price: float, day: Optional[date], replay: tuple) -> dict:
+    net, replayed = replay
+    quantity = (quantity or 0) + net
+    price = price or 0
+    return {
+        "item_id": item_id,
+        "at": at,
+        "quantity": quantity,
+        "price": price,
+        "value": quantity * price,
+        "snapshot_day": day,
+        "replayed": replayed,
+    }
+
+def stock_at(db: Session, item_id: int, at: datetime) -> Optional[dict]:
+    """The stock of one item at the start of `at`, or None when the item does not exist."""
+    item = db.query(models.Item.quantity, models.Item.price).filter(models.Item.id == item_id).first()
+    if item is None:
+        return None
+    now = datetime.utcnow()
+    day = _nearest_day(db, at, now, item_id)
+    if day is None:
+        quantity, price, anchor = item.quantity, item.price, now
+    else:
+        snapshot = db.get(models.ItemStockSnapshot, (item_id, day))
+        quantity, price, anchor = snapshot.quantity, snapshot.price, _end_of(day)
+    replay = _replay(db, anchor, at, item_id).get(item_id, (0, 0))
+    return _stock(item_id, at, quantity, price, day, replay)
+
+def stock_at_all(db: Session, at: datetime) -> list:
+    """The stock of every current item at the start of `at`.
+
+    All items share one anchor; items created after that snapshot fall back
+    to their current stock.
+    """
+    now = datetime.utcnow()
+    items = db.query(models.Item.id, models.Item.quantity, models.Item.price).order_by(models.Item.id).all()
+    day = _nearest_day(db, at, now)
+    snapshots = {}
+    if day is not None:
+        snapshot = models.ItemStockSnapshot
+        snapshots = {
+            row.item_id: row
+            for row in db.query(snapshot.item_id, snapshot.quantity, snapshot.price).filter(snapshot.day == day)
+        }
+        from_snapshot = _replay(db, _end_of(day), at)
+    from_current = _replay(db, now, at) if len(snapshots) < len(items) else {}
+
+    stock = []
+    for item_id, quantity, price in items:
+        row = snapshots.get(item_id)
+        if row is not None:
+            stock.append(_stock(item_id, at, row.quantity, row.price, day, from_snapshot.get(item_id, (0, 0))))
+        else:
+            stock.append(_stock(item_id, at, quantity, price, None, from_current.get(item_id, (0, 0))))
+    return stock
+
+def main(argv=None):
+    from .database import SessionLocal
+    from .startup import create_schema
+
+    parser = argparse.ArgumentParser(description="Write or prune item stock snapshots")
+    parser.add_argument("command", choices=["take", "backfill", "prune"])
+    parser.add_argument("--day", type=date.fromisoformat, help="day to snapshot with `take` (default: yesterday, UTC)")
+    parser.add_argument("--keep-days", type=int, default=KEEP_DAYS)
+    args = parser.parse_args(argv)
+
+    today = datetime.utcnow().date()
+    if args.day is not None and args.day >= today:
+        parser.error("--day must be a day that has ended")
+
+    create_schema()
+    db = SessionLocal()
+    try:
+        if args.command == "prune":
+            print(f"Pruned {prune(db, today, args.keep_days)} snapshots")
+        else:
+            days = backfill_days(db, today) if args.command == "backfill" else [args.day or today - timedelta(days=1)]
+            written = take(db, days)
+            pruned = prune(db, today, args.keep_days)
+            print(f"Wrote {written} snapshots for {len(days)} day(s), pruned {pruned}")
+        db.commit()
+        return 0
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Show how admission control keeps CRUD responsive while reports are flooded.
+
+`--flood` clients download /export/transactions.csv back to back while a
+probe client alternates GET /farmers/ and POST /farmers/ and records its
+latency. Each mode runs in its own process against a fresh SQLite database
+seeded with `--transactions` rows, with the app driven in-process over ASGI.
+
+    python bench_admission.py --flood 100 --duration 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+def child(flood, duration, transactions):
+    import asyncio
+    import httpx
+    from backend import admission
+    from backend.main import app
+
+    async def probe(http, deadline, latencies, statuses):
+        n = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            if n % 2:
+                response = await http.post("/farmers/", json={"name": f"probe {n}", "phone": "1"})
+            else:
+                response = await http.get("/farmers/", params={"limit": 20})
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            n += 1
+            await asyncio.sleep(0.01)
+
+    async def flooder(http, deadline, statuses):
+        while time.perf_counter() < deadline:
+            response = await http.get("/export/transactions.csv")
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            # Errors inside the app become 500 responses, as behind a real server
+            transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as http:
+                await http.post("/items/", json={"name": "maize", "type": "crop", "quantity": 10 ** 9, "price": 1.0})
+                rows = [{"item_id": 1, "type": "sell", "quantity": 1, "price_per_unit": 2.0}] * 1000
+                for _ in range(transactions // 1000):
+                    await http.post("/items/transactions/bulk", json=rows)
+                latencies, probe_statuses, flood_statuses = [], {}, {}
+                deadline = time.perf_counter() + duration
+                await asyncio.gather(
+                    probe(http, deadline, latencies, probe_statuses),
+                    *(flooder(http, deadline, flood_statuses) for _ in range(flood)),
+                )
+                return latencies, probe_statuses, flood_statuses
+
+    latencies, probe_statuses, flood_statuses = asyncio.run(run())
+    print(json.dumps({
+        "p50": percentile(latencies, 0.5), "p99": percentile(latencies, 0.99), "probes": len(latencies),
+        "probe_statuses": probe_statuses, "flood_statuses": flood_statuses,
+        "reports": admission.stats()["groups"][admission.REPORTS],
+    }))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flood", type=int, default=100, help="concurrent export clients")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--transactions", type=int, default=20_000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.flood, args.duration, args.transactions)
+        sys.exit(0)
+
+    for label, enabled in (("admission control", "1"), ("no admission", "0")):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(
+                os.environ, PYTHONPATH=ROOT, ADMISSION_CONTROL=enabled,
+                DATABASE_URL=f"sqlite:///{os.path.join(directory, 'farm.db')}",
+            )
+            command = [sys.executable, os.path.abspath(__file__), "--child", "--flood", str(args.flood),
+                       "--duration", str(args.duration), "--transactions", str(args.transactions)]
+            output = subprocess.run(command, cwd=directory, env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{label:<18} CRUD p50/p99 {result['p50']:8.1f}/{result['p99']:8.1f} ms ({result['probes']} probes, "
+            f"statuses {result['probe_statuses']})   export statuses {result['flood_statuses']}"
+        )
@@ -0,0 +1,104 @@
+"""Compare POST /items/transactions/ throughput with per-request commits and with batching.
+
+Each mode runs in its own process against a fresh SQLite database. The app is
+driven in-process over ASGI by `--clients` concurrent clients, each posting
+`--requests` buys and sells. The HTTP server is left out so the numbers show
+the cost of the write path. Afterwards each item's stock is checked against
+the ledger.
+
+    python bench_ingest.py --clients 200 --requests 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def child(clients, requests_per_client, items):
+    import asyncio
+    import random
+    import httpx
+    from sqlalchemy import case, func
+    from backend import ingest, models
+    from backend.database import SessionLocal
+    from backend.main import app
+
+    async def client(http, seed, outcomes):
+        rng = random.Random(seed)
+        for _ in range(requests_per_client):
+            payload = {
+                "item_id": rng.randint(1, items),
+                "type": "sell" if rng.random() < 0.6 else "buy",
+                "quantity": rng.randint(1, 3),
+                "price_per_unit": 2.5,
+            }
+            response = await http.post("/items/transactions/", json=payload)
+            outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+                for n in range(items):
+                    await http.post("/items/", json={"name": f"item {n}", "type": "crop", "quantity": 500, "price": 2.0})
+                outcomes = {}
+                started = time.perf_counter()
+                await asyncio.gather(*(client(http, seed, outcomes) for seed in range(clients)))
+                elapsed = time.perf_counter() - started
+            return outcomes, elapsed, ingest.batcher.stats()
+
+    outcomes, elapsed, stats = asyncio.run(run())
+
+    db = SessionLocal()
+    try:
+        signed = case((models.Transaction.type == "buy", models.Transaction.quantity), else_=-models.Transaction.quantity)
+        ledger = dict(db.query(models.Transaction.item_id, func.sum(signed)).group_by(models.Transaction.item_id))
+        consistent = all(
+            quantity == 500 + ledger.get(item_id, 0) and quantity >= 0
+            for item_id, quantity in db.query(models.Item.id, models.Item.quantity)
+        )
+    finally:
+        db.close()
+    total = sum(outcomes.values())
+    print(json.dumps({
+        "requests": total, "elapsed": elapsed, "outcomes": outcomes, "batching": stats, "consistent": consistent,
+    }))
+
+def spawn(batching, args):
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(
+            os.environ,
+            PYTHONPATH=ROOT,
+            DATABASE_URL=f"sqlite:///{os.path.join(directory, 'farm.db')}",
+            TRANSACTION_BATCHING="1" if batching else "0",
+        )
+        command = [sys.executable, os.path.abspath(__file__), "--child",
+                   "--clients", str(args.clients), "--requests", str(args.requests), "--items", str(args.items)]
+        output = subprocess.run(command, cwd=directory, env=env, capture_output=True, text=True, check=True).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=20, help="per client")
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.clients, args.requests, args.items)
+        sys.exit(0)
+
+    for label, batching in (("per-request commits", False), ("batched commits", True)):
+        result = spawn(batching, args)
+        line = (
+            f"{label:<20} {result['requests'] / result['elapsed']:9,.0f} transactions/s  "
+            f"statuses {result['outcomes']}  stock matches ledger: {result['consistent']}"
+        )
+        if batching:
+            line += f"  average batch {result['batching']['average_batch']}"
+        print(line)
@@ -0,0 +1,92 @@
+"""Show how a storm of logins affects the latency of other requests.
+
+A probe client requests GET /farmers/ back to back and records its latency,
+first on an idle server and then while `--logins` clients post to /token as
+fast as they can. Each mode runs in its own process against a fresh SQLite
+database, with the app driven in-process over ASGI.
+
+- offloaded: bcrypt runs on the bounded password pool (the current code).
+- inline: bcrypt runs on the event loop, as login used to.
+
+    python bench_login_storm.py --logins 50 --duration 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000 if values else 0.0
+
+def child(mode, logins, duration):
+    import asyncio
+    import httpx
+    from backend import auth
+    from backend.main import app
+
+    if mode == "inline":
+        async def check_password(plain_password, hashed_password):
+            return auth.verify_password(plain_password, hashed_password)
+        auth.check_password = check_password
+
+    async def probe(http, deadline, latencies):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await http.get("/farmers/")
+            latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.005)
+
+    async def login(http, deadline, statuses):
+        while time.perf_counter() < deadline:
+            response = await http.post("/token", data={"username": "admin", "password": "admin123"})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 503:
+                await asyncio.sleep(float(response.headers.get("Retry-After", "1")) / 10)
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as http:
+                idle = []
+                await probe(http, time.perf_counter() + min(duration, 2), idle)
+                storm, statuses = [], {}
+                deadline = time.perf_counter() + duration
+                await asyncio.gather(probe(http, deadline, storm), *(login(http, deadline, statuses) for _ in range(logins)))
+                return idle, storm, statuses
+
+    idle, storm, statuses = asyncio.run(run())
+    print(json.dumps({
+        "idle_p50": percentile(idle, 0.5), "idle_p99": percentile(idle, 0.99),
+        "storm_p50": percentile(storm, 0.5), "storm_p99": percentile(storm, 0.99),
+        "probes": len(storm), "logins": statuses,
+    }))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50, help="concurrent login clients")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--child", choices=["offloaded", "inline"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.logins, args.duration)
+        sys.exit(0)
+
+    for mode in ("offloaded", "inline"):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'farm.db')}")
+            command = [sys.executable, os.path.abspath(__file__), "--child", mode,
+                       "--logins", str(args.logins), "--duration", str(args.duration)]
+            output = subprocess.run(command, cwd=directory, env=env, capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{mode:<10} GET /farmers/ p50/p99 idle {result['idle_p50']:7.1f}/{result['idle_p99']:7.1f} ms   "
+            f"during logins {result['storm_p50']:7.1f}/{result['storm_p99']:7.1f} ms   "
+            f"({result['probes']} probes)   /token statuses {result['logins']}"
+        )
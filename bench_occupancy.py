@@ -0,0 +1,75 @@
+"""Time land availability and planting conflict checks on a large planting history.
+
+Creates `--lands` lands with `--plantings` back-to-back plantings each in a
+fresh SQLite database, then times GET /lands/availability-style queries and
+overlap checks through the interval index (backend/occupancy.py) against a
+plain range scan of every planting that starts before the end of the range.
+
+    python bench_occupancy.py --lands 2000 --plantings 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lands", type=int, default=2000)
+    parser.add_argument("--plantings", type=int, default=200, help="per land")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'farm.db')}"
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import insert, select
+    from backend import models, occupancy, startup
+    from backend.database import SessionLocal, engine
+
+    startup.create_schema(engine)
+    db = SessionLocal()
+    first = datetime(2000, 1, 1)
+    db.execute(insert(models.Land), [{"name": f"land {n}", "location": "x", "size": n % 10} for n in range(args.lands)])
+    # Seasons of 90 days with a 10 day fallow in between; every fifth land is busy in the last season
+    season = timedelta(days=100)
+    rows = []
+    for land_id in range(1, args.lands + 1):
+        count = args.plantings if land_id % 5 else args.plantings + 1
+        for n in range(count):
+            start = first + season * n
+            rows.append({"land_id": land_id, "crop_name": "rice", "planting_date": start, "expected_harvest_date": start + timedelta(days=90)})
+    db.execute(insert(models.Crop), rows)
+    db.commit()
+
+    start = first + season * args.plantings
+    end = start + timedelta(days=60)
+    crop = models.Crop
+
+    def scan(land_id):
+        return list(db.scalars(select(crop.id).where(
+            crop.land_id == land_id, crop.planting_date < end, crop.expected_harvest_date > start)))
+
+    def scan_free():
+        busy = {row[0] for row in db.query(crop.land_id).filter(crop.planting_date < end, crop.expected_harvest_date > start).distinct()}
+        return [land for land in db.query(models.Land).order_by(models.Land.id) if land.id not in busy]
+
+    print(f"{args.lands} lands x {args.plantings} plantings ({len(rows):,} crops)")
+    for label, function in (
+        ("conflict check, interval index", lambda: occupancy.overlapping(db, 5, start, end)),
+        ("conflict check, range scan", lambda: scan(5)),
+        ("free lands, interval index", lambda: occupancy.free_lands(db, start, end)),
+        ("free lands, range scan", scan_free),
+    ):
+        elapsed, result = timed(function, args.repeat)
+        print(f"{label:<32} {elapsed:9.3f} ms   ({len(result)} results)")
+    db.close()
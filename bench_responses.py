@@ -0,0 +1,92 @@
+"""Compare JSON encode time and response size before and after fast encoding + compression.
+
+Encodes a synthetic transaction list the way FastAPI did before (jsonable_encoder
++ json.dumps), with pydantic's dump_json (response_model routes) and with
+backend.responses.dumps (report routes), then compresses the result. With --url
+it also measures bytes on the wire from a running server.
+
+    python bench_responses.py --rows 100000
+    python bench_responses.py --url http://localhost:8000/items/transactions/?limit=100000
+"""
+import argparse
+import gzip
+import json
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from backend import schemas
+from backend.responses import dumps
+
+def make_rows(count):
+    start = datetime(2025, 1, 1, 8, 30)
+    return [
+        {
+            "id": i,
+            "item_id": i % 50 + 1,
+            "type": "buy" if i % 3 else "sell",
+            "quantity": i % 40 + 1,
+            "price_per_unit": 12.75,
+            "total_price": (i % 40 + 1) * 12.75,
+            "buyer_name": None if i % 3 else f"Buyer {i % 17}",
+            "date": start + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+def timed(label, encode, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<38} {best * 1000:9.1f} ms {len(body):>12,} bytes")
+    return body
+
+def bench_encoding(count, repeat):
+    rows = make_rows(count)
+    adapter = TypeAdapter(List[schemas.Transaction])
+    models = adapter.validate_python(rows)
+
+    print(f"--- Encoding {count:,} transactions (best of {repeat}) ---")
+    before = timed("jsonable_encoder + json.dumps", lambda: json.dumps(jsonable_encoder(models)).encode("utf-8"), repeat)
+    timed("pydantic dump_json (response_model)", lambda: adapter.dump_json(models), repeat)
+    timed("responses.dumps (plain dicts)", lambda: dumps(rows), repeat)
+
+    print("--- Bytes on the wire ---")
+    print(f"{'identity':<38} {len(before):>12,} bytes")
+    for label, compress in (
+        ("gzip level 6", lambda: gzip.compress(before, compresslevel=6)),
+        ("deflate level 6", lambda: zlib.compress(before, 6)),
+    ):
+        timed(label, compress, repeat)
+
+def bench_url(url):
+    import requests
+
+    print(f"--- {url} ---")
+    for encoding in ("identity", "gzip", "deflate"):
+        started = time.perf_counter()
+        response = requests.get(url, headers={"Accept-Encoding": encoding}, stream=True)
+        wire = sum(len(chunk) for chunk in response.raw.stream(65536, decode_content=False))
+        elapsed = time.perf_counter() - started
+        print(
+            f"{encoding:<10} status {response.status_code} "
+            f"{response.headers.get('Content-Encoding', '-'):<8} {wire:>12,} bytes {elapsed * 1000:9.1f} ms"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--url", help="also fetch this URL from a running server")
+    args = parser.parse_args()
+
+    bench_encoding(args.rows, args.repeat)
+    if args.url:
+        bench_url(args.url)
@@ -0,0 +1,78 @@
+"""Measure how long a worker takes to become ready, cold and warm, alone and in a crowd.
+
+Each worker is a fresh Python process that imports backend.main and runs the
+application's lifespan startup, the same as one `uvicorn --workers N` worker.
+Import time and initialization time are reported separately. The first run
+starts against an empty database; the second finds the schema current. The
+last run starts `--workers` processes together on an empty database and checks
+that exactly one admin user was created.
+
+    python bench_startup.py --workers 8
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+WORKER = """
+import asyncio, json, time
+started = time.perf_counter()
+from backend.main import app
+imported = time.perf_counter()
+
+async def start():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+print(json.dumps({"import_ms": (imported - started) * 1000, "init_ms": (ready - imported) * 1000}))
+"""
+
+def spawn(directory):
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL=f"sqlite:///{os.path.join(directory, 'farm.db')}")
+    return subprocess.Popen(
+        [sys.executable, "-c", WORKER], cwd=directory, env=env, stdout=subprocess.PIPE, text=True
+    )
+
+def collect(process):
+    output, _ = process.communicate()
+    if process.returncode != 0:
+        raise SystemExit(f"worker exited with {process.returncode}")
+    return json.loads(output.strip().splitlines()[-1])
+
+def report(label, results, wall_ms=None):
+    import_ms = max(result["import_ms"] for result in results)
+    init_ms = max(result["init_ms"] for result in results)
+    line = f"{label:<28} import {import_ms:8.1f} ms   init {init_ms:8.1f} ms"
+    if wall_ms is not None:
+        line += f"   all ready after {wall_ms:8.1f} ms"
+    print(line)
+
+def admin_count(directory):
+    connection = sqlite3.connect(os.path.join(directory, "farm.db"))
+    try:
+        return connection.execute("SELECT COUNT(*) FROM users WHERE username = 'admin'").fetchone()[0]
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        report("1 worker, empty database", [collect(spawn(directory))])
+        report("1 worker, schema current", [collect(spawn(directory))])
+
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        results = [collect(process) for process in [spawn(directory) for _ in range(args.workers)]]
+        wall_ms = (time.perf_counter() - started) * 1000
+        report(f"{args.workers} workers, empty database", results, wall_ms)
+        print(f"admin users created: {admin_count(directory)}")
@@ -17,45 +17,26 @@ const CropPlanning = () => {
         notes: ''
     });
 
-    const fetchCrops = async () => {
+    // Lands and crops come back from one request; with a land selected, its next 4 months of crops
+    const fetchCrops = async (landId = selectedLand) => {
         try {
-            const response = await api.get('/crops/');
-            setCrops(response.data);
+            const response = await api.get('/views/crop-planning', {
+                params: landId ? { land_id: landId } : {}
+            });
+            setLands(response.data.lands);
+            setCrops(response.data.crops);
         } catch (error) {
             console.error('Error fetching crops:', error);
         }
     };
 
-    const fetchCropsByLand = async (landId) => {
-        try {
-            const response = await api.get(`/crops/land/${landId}/4months`);
-            setCrops(response.data);
-        } catch (error) {
-            console.error('Error fetching crops for land:', error);
-        }
-    };
-
-    const fetchLands = async () => {
-        try {
-            const response = await api.get('/lands/');
-            setLands(response.data);
-        } catch (error) {
-            console.error('Error fetching lands:', error);
-        }
-    };
-
     useEffect(() => {
         fetchCrops();
-        fetchLands();
     }, []);
 
     const handleLandChange = (landId) => {
         setSelectedLand(landId);
-        if (landId) {
-            fetchCropsByLand(landId);
-        } else {
-            fetchCrops();
-        }
+        fetchCrops(landId);
     };
 
     const handleSubmit = async (e) => {
@@ -77,11 +58,7 @@ const CropPlanning = () => {
             setEditingCrop(null);
             setIsFormOpen(false);
 
-            if (selectedLand) {
-                fetchCropsByLand(selectedLand);
-            } else {
-                fetchCrops();
-            }
+            fetchCrops();
         } catch (error) {
             console.error('Error saving crop:', error);
         }
@@ -105,11 +82,7 @@ const CropPlanning = () => {
         if (window.confirm('Are you sure you want to delete this crop plan?')) {
             try {
                 await api.delete(`/crops/${id}`);
-                if (selectedLand) {
-                    fetchCropsByLand(selectedLand);
-                } else {
-                    fetchCrops();
-                }
+                fetchCrops();
             } catch (error) {
                 console.error('Error deleting crop:', error);
             }
@@ -122,11 +95,7 @@ const CropPlanning = () => {
                 status: 'Harvested',
                 actual_harvest_date: new Date().toISOString()
             });
-            if (selectedLand) {
-                fetchCropsByLand(selectedLand);
-            } else {
-                fetchCrops();
-            }
+            fetchCrops();
         } catch (error) {
             console.error('Error updating crop:', error);
         }
@@ -24,18 +24,18 @@ const InventoryManager = () => {
         }
     };
 
-    const fetchTransactions = async () => {
+    const fetchInventory = async () => {
         try {
-            const response = await api.get('/items/transactions/');
-            setTransactions(response.data);
+            const response = await api.get('/views/inventory');
+            setItems(response.data.items);
+            setTransactions(response.data.transactions);
         } catch (error) {
-            console.error('Error fetching transactions:', error);
+            console.error('Error fetching inventory:', error);
         }
     };
 
     useEffect(() => {
-        fetchItems();
-        fetchTransactions();
+        fetchInventory();
     }, []);
 
     const handleItemSubmit = async (e) => {
@@ -59,8 +59,7 @@ const InventoryManager = () => {
         try {
             await api.post('/items/transactions/', transactionForm);
             setTransactionForm({ item_id: '', type: 'buy', quantity: 0, price_per_unit: 0, buyer_name: '' });
-            fetchItems();
-            fetchTransactions();
+            fetchInventory();
             setActiveTab('transactions');
         } catch (error) {
             console.error('Error creating transaction:', error);
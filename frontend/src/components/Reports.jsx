@@ -14,17 +14,12 @@ const Reports = () => {
 
     const fetchReports = async () => {
         try {
-            const [summaryRes, farmerRes, itemRes, transactionRes] = await Promise.all([
-                api.get('/reports/summary'),
-                api.get('/reports/farmers'),
-                api.get('/reports/items'),
-                api.get('/reports/transactions/summary')
-            ]);
+            const response = await api.get('/views/reports');
 
-            setSummary(summaryRes.data);
-            setFarmerReport(farmerRes.data);
-            setItemReport(itemRes.data);
-            setTransactionSummary(transactionRes.data);
+            setSummary(response.data.summary);
+            setFarmerReport(response.data.farmers);
+            setItemReport(response.data.items);
+            setTransactionSummary(response.data.transactions);
         } catch (error) {
             console.error('Error fetching reports:', error);
         }
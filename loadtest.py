@@ -0,0 +1,68 @@
+"""Measure requests per second against a running server at a given concurrency.
+
+Each client keeps one request in flight for the whole duration, so the result
+shows how many requests the server completes while `--concurrency` of them
+are always waiting on it. Run it against a checkout before and after a change,
+with the same database, to compare:
+
+    uvicorn backend.main:app --port 8000
+    python loadtest.py --url http://localhost:8000/farmers/ --concurrency 200 --duration 20
+    python loadtest.py --url http://localhost:8000/reports/summary --token <jwt>
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+async def client(http, url, deadline, latencies):
+    errors = 0
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await http.get(url)
+        except httpx.HTTPError:
+            errors += 1
+            continue
+        if response.status_code >= 400:
+            errors += 1
+        else:
+            latencies.append(time.perf_counter() - started)
+    return errors
+
+async def run(url, concurrency, duration, headers):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    latencies = []
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=60) as http:
+        started = time.perf_counter()
+        deadline = started + duration
+        errors = sum(await asyncio.gather(*(client(http, url, deadline, latencies) for _ in range(concurrency))))
+        elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print(f"no successful requests ({errors} errors)")
+        return
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"--- {url} ---")
+    print(f"concurrency      {concurrency}")
+    print(f"requests         {len(latencies):,} ({errors} errors)")
+    print(f"requests/second  {len(latencies) / elapsed:,.1f}")
+    print(f"latency mean     {statistics.fmean(latencies) * 1000:.1f} ms")
+    print(f"latency p50      {percentile(0.50):.1f} ms")
+    print(f"latency p99      {percentile(0.99):.1f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000/farmers/")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--token", help="bearer token for routes behind login")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    asyncio.run(run(args.url, args.concurrency, args.duration, headers))
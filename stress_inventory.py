@@ -0,0 +1,99 @@
+"""Hammer one item with concurrent buys and sells and check its stock against the ledger.
+
+Runs against a fresh SQLite database in a temporary directory, with many
+threads each recording transactions through crud.create_transaction on their
+own session. Afterwards the item's quantity must equal its starting stock plus
+the purchases minus the sales in the transactions table, and must never have
+gone below zero. Sales the stock cannot cover are rejected and counted.
+
+--naive records the same load with the old read-modify-write update for
+comparison; it loses updates under contention.
+
+    python stress_inventory.py --threads 16 --transactions 500
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--transactions", type=int, default=500, help="per thread")
+    parser.add_argument("--stock", type=int, default=1000)
+    parser.add_argument("--sell-ratio", type=float, default=0.7)
+    parser.add_argument("--naive", action="store_true", help="use the old read-modify-write update")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory, 'farm.db')}"
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from sqlalchemy import func
+    from backend import crud, models, schemas, startup
+    from backend.database import SessionLocal
+
+    startup.create_schema()
+    db = SessionLocal()
+    item_id = crud.create_item(db, schemas.ItemCreate(name="fertilizer", type="input", quantity=args.stock, price=2.0)).id
+    db.close()
+
+    def naive_transaction(db, transaction):
+        db_item = db.query(models.Item).filter(models.Item.id == transaction.item_id).first()
+        db_item.quantity += transaction.quantity if transaction.type == "buy" else -transaction.quantity
+        db.add(models.Transaction(**transaction.model_dump(), total_price=0, date=None))
+        db.commit()
+
+    record = naive_transaction if args.naive else crud.create_transaction
+    counts = {"recorded": 0, "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def worker(seed):
+        rng = random.Random(seed)
+        db = SessionLocal()
+        try:
+            for _ in range(args.transactions):
+                kind = "sell" if rng.random() < args.sell_ratio else "buy"
+                transaction = schemas.TransactionCreate(
+                    item_id=item_id, type=kind, quantity=rng.randint(1, 5), price_per_unit=2.0
+                )
+                try:
+                    record(db, transaction)
+                    outcome = "recorded"
+                except crud.InsufficientStock:
+                    outcome = "rejected"
+                except Exception:
+                    db.rollback()
+                    outcome = "errors"
+                with lock:
+                    counts[outcome] += 1
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        quantity = db.query(models.Item.quantity).filter(models.Item.id == item_id).scalar()
+        bought = db.query(func.coalesce(func.sum(models.Transaction.quantity), 0)).filter(models.Transaction.type == "buy").scalar()
+        sold = db.query(func.coalesce(func.sum(models.Transaction.quantity), 0)).filter(models.Transaction.type == "sell").scalar()
+    finally:
+        db.close()
+
+    expected = args.stock + bought - sold
+    print(f"{'naive' if args.naive else 'atomic'} update, {args.threads} threads x {args.transactions} transactions")
+    print(f"recorded {counts['recorded']:,}  rejected {counts['rejected']:,}  errors {counts['errors']:,}  "
+          f"in {elapsed:.2f} s ({counts['recorded'] / elapsed:,.0f}/s)")
+    print(f"stock {quantity}  ledger {expected}  {'OK' if quantity == expected and quantity >= 0 else 'MISMATCH'}")
+    return 0 if quantity == expected and quantity >= 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+from backend import rollup
+
+def test_bulk_task_update_rejects_repeated_ids(client, db):
+    farmer = client.post("/farmers/", json={"name": "a", "phone": "1"}).json()
+    task = client.post("/tasks/", json={"description": "weed", "farmer_id": farmer["id"]}).json()
+
+    result = client.put("/tasks/bulk", json=[
+        {"id": task["id"], "status": "Completed"},
+        {"id": task["id"], "status": "Completed"},
+    ]).json()
+
+    assert result["ids"] == [task["id"], None]
+    assert result["errors"] == [{"index": 1, "detail": f"Task {task['id']} listed more than once"}]
+    assert rollup.verify(db) == {}
+
+def test_bulk_land_update_rejects_repeated_ids(client):
+    land = client.post("/lands/", json={"name": "L", "location": "x", "size": 1}).json()
+
+    result = client.put("/lands/bulk", json=[{"id": land["id"], "size": 2}, {"id": land["id"], "size": 3}]).json()
+
+    assert result["ids"] == [land["id"], None]
+    assert client.get(f"/lands/{land['id']}").json()["size"] == 2
@@ -0,0 +1,35 @@
+def _land(client):
+    return client.post("/lands/", json={"name": "L", "location": "x", "size": 1}).json()["id"]
+
+def _crop(land_id, start, end):
+    return {"crop_name": "rice", "land_id": land_id, "planting_date": start, "expected_harvest_date": end}
+
+def test_inverted_planting_is_refused_and_overlaps_still_found(client):
+    land_id = _land(client)
+    crop = client.post("/crops/", json=_crop(land_id, "2026-01-01T00:00:00", "2026-03-01T00:00:00")).json()
+
+    assert client.post("/crops/", json=_crop(land_id, "2026-12-01T00:00:00", "2026-11-01T00:00:00")).status_code == 400
+    assert client.post("/crops/", json=_crop(land_id, "2026-06-01T00:00:00", "2026-06-01T00:00:00")).status_code == 400
+    assert client.put(f"/crops/{crop['id']}", json={"expected_harvest_date": "2025-12-01T00:00:00"}).status_code == 400
+    assert client.get(f"/crops/{crop['id']}").json()["expected_harvest_date"] == "2026-03-01T00:00:00"
+
+    response = client.post("/crops/", json=_crop(land_id, "2026-02-01T00:00:00", "2026-04-01T00:00:00"))
+    assert response.status_code == 409
+    free = client.get("/lands/availability", params={"from": "2026-02-01T00:00:00", "to": "2026-02-02T00:00:00"}).json()
+    assert land_id not in [land["id"] for land in free]
+
+def test_bulk_inverted_planting_is_a_row_error(client):
+    land_id = _land(client)
+    result = client.post("/crops/bulk", json=[
+        _crop(land_id, "2026-01-01T00:00:00", "2026-03-01T00:00:00"),
+        _crop(land_id, "2026-12-01T00:00:00", "2026-11-01T00:00:00"),
+        _crop(land_id, "2026-02-01T00:00:00", "2026-04-01T00:00:00"),
+    ]).json()
+
+    assert result["ids"][0] is not None and result["ids"][1:] == [None, None]
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    assert "must be after planting_date" in result["errors"][0]["detail"]
+
+    moved = client.put("/crops/bulk", json=[{"id": result["ids"][0], "planting_date": "2026-05-01T00:00:00"}]).json()
+    assert moved["ids"] == [None]
+    assert client.post("/crops/", json=_crop(land_id, "2026-02-01T00:00:00", "2026-04-01T00:00:00")).status_code == 409
@@ -0,0 +1,13 @@
+import pytest
+
+@pytest.mark.parametrize("path", ["/farmers/", "/tasks/", "/items/", "/items/transactions/", "/assets/", "/lands/", "/crops/"])
+@pytest.mark.parametrize("limit", [0, -1, 100_001])
+def test_bad_page_size_is_rejected(client, path, limit):
+    assert client.get(path, params={"limit": limit}).status_code == 422
+
+def test_limit_pages_with_a_cursor(client):
+    for name in ("a", "b", "c"):
+        client.post("/farmers/", json={"name": name, "phone": "1"})
+    response = client.get("/farmers/", params={"limit": 1})
+    assert response.status_code == 200 and len(response.json()) == 1
+    assert response.headers["x-next-cursor"]
@@ -0,0 +1,23 @@
+from sqlalchemy import update
+
+from backend import costing, models, rollup
+
+def test_rollup_rebuild_invalidates_cached_summary(client, db):
+    client.post("/farmers/", json={"name": "a", "phone": "1"})
+    response = client.get("/reports/summary")
+    farmers, tag = response.json()["farmers"]["total"], response.headers["etag"]
+
+    # Drift the rollup behind the API's back, as a bad deploy or hand edit would
+    db.execute(update(models.ReportRollup).values(farmers=models.ReportRollup.farmers + 5))
+    db.commit()
+    assert client.get("/reports/summary", headers={"If-None-Match": tag}).status_code == 304
+
+    assert rollup.main(["rebuild"]) == 0
+    response = client.get("/reports/summary", headers={"If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.json()["farmers"]["total"] == farmers
+
+def test_cost_basis_rebuild_changes_the_tag(client, db):
+    tag = client.get("/reports/transactions/cost-basis").headers["etag"]
+    costing.rebuild(db)
+    assert client.get("/reports/transactions/cost-basis", headers={"If-None-Match": tag}).status_code == 200